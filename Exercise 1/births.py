@@ -0,0 +1,149 @@
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+import pyarrow.feather as feather
+
+# Constants
+MAXIMUM_YEAR = 2016
+MINIMUM_VALUE = 10
+DATASET = "20151001_hundenamen.csv"
+# Columns of the registry export and their names in the data frames
+COLUMNS = {
+    "HUNDENAME": "name",
+    "GEBURTSJAHR_HUND": "birth_year",
+    "GESCHLECHT_HUND": "gender",
+}
+# Compact dtypes of the columns, years of birth fit into int16 and names and genders repeat a lot
+DTYPES = {"name": "category", "birth_year": np.int16, "gender": "category"}
+# Number of rows read at once when streaming the dataset
+CHUNK_ROWS = 1000000
+# Directory next to the dataset holding the cleaned tables
+CACHE_DIRECTORY = ".births_cache"
+# Bump when the cleaned table changes, old cache files are then no longer used
+CACHE_VERSION = 1
+
+# Births per year of all years by (path, modification time) of the dataset
+all_births_cache = {}
+
+
+# Read the dataset in chunks of renamed columns. Only the requested columns are parsed.
+def read_chunks(path, columns=("name", "birth_year", "gender"), chunksize=CHUNK_ROWS):
+    raw_names = {name: raw for raw, name in COLUMNS.items()}
+    usecols = [raw_names[column] for column in columns]
+    dtype = {raw_names[column]: DTYPES[column] for column in columns}
+
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        yield chunk.rename(columns=COLUMNS)
+
+
+# Count the births per year of all dogs born before maximum_year. The file is read in chunks and the counts are merged
+# chunk by chunk, so the memory used does not grow with the size of the file. With by set to "gender" or "name", or a
+# list of both, the births are counted per year and group, indexed by (birth_year, group...).
+def births_per_year(path, maximum_year=MAXIMUM_YEAR, chunksize=CHUNK_ROWS, by=None):
+    if by is None:
+        columns = ["birth_year"]
+    else:
+        columns = ["birth_year"] + ([by] if isinstance(by, str) else list(by))
+    counts = None
+    for chunk in read_chunks(path, columns, chunksize):
+        chunk = chunk[chunk["birth_year"] < maximum_year]
+        if by is None:
+            chunk_counts = chunk["birth_year"].value_counts()
+        else:
+            chunk_counts = chunk.groupby(columns, observed=True).size()
+        counts = (
+            chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        )
+
+    if counts is None:
+        return pd.Series([], dtype=np.int64, index=pd.Index([], name="birth_year"))
+    counts = counts.sort_index().astype(np.int64)
+    if by is None:
+        counts.index = counts.index.astype(np.int64)
+        counts.index.name = "birth_year"
+    else:
+        years = counts.index.levels[0].astype(np.int64)
+        counts.index = counts.index.set_levels(years, level=0)
+    return counts
+
+
+# Births per year of all years, before any cleaning. They are kept in memory per file and modification time, so all
+# sessions of a bokeh server share them.
+def all_births_per_year(path):
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in all_births_cache:
+        all_births_cache[key] = births_per_year(path, np.iinfo(np.int16).max)
+    return all_births_cache[key]
+
+
+# Only keep the years with more than minimum_value births and put them in a data frame of Years and Numbers
+def clean_births(counts, minimum_value=MINIMUM_VALUE):
+    counts = counts[counts > minimum_value]
+    return pd.DataFrame({"Years": counts.index, "Numbers": counts.values})
+
+
+# Pivot the births per year and group into a dense table with one row per year and one column per group. Like in
+# clean_births only the years with more than minimum_value births in total are kept. With top set, only the groups
+# with the most births are kept.
+def births_table(counts, minimum_value=MINIMUM_VALUE, top=None):
+    table = counts.unstack(fill_value=0)
+    table = table[table.sum(axis=1) > minimum_value]
+    if top is not None:
+        table = table[table.sum().nlargest(top).index]
+    table.index.name = "Years"
+    return table
+
+
+# Hash of the dataset and the constants used to clean it, cached tables are stored under this name. Tables counted per
+# group, see births_per_year, also hash the grouping columns.
+def cache_key(path, maximum_year=MAXIMUM_YEAR, minimum_value=MINIMUM_VALUE, by=None):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(
+        "{} {} {}".format(CACHE_VERSION, maximum_year, minimum_value).encode()
+    )
+    if by is not None:
+        digest.update(" by {}".format(by).encode())
+    return digest.hexdigest()
+
+
+# Path of a cached table of a dataset
+def cache_path(path, key):
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRECTORY)
+    return os.path.join(directory, key + ".feather")
+
+
+# Load the cleaned births per year of a dataset. The table is cached as an uncompressed Feather file next to the
+# dataset, later runs memory map it instead of parsing the CSV again. A changed dataset or changed constants give a
+# new cache key.
+def load_births(
+    path, maximum_year=MAXIMUM_YEAR, minimum_value=MINIMUM_VALUE, chunksize=CHUNK_ROWS
+):
+    table_path = cache_path(path, cache_key(path, maximum_year, minimum_value))
+    if os.path.exists(table_path):
+        return feather.read_feather(table_path, memory_map=True)
+
+    df = clean_births(births_per_year(path, maximum_year, chunksize), minimum_value)
+    write_cache(df, table_path)
+    return df
+
+
+# Write a table to the cache. It is written to a temporary file first, so other processes never read half written
+# tables. The cache is only an optimization: when it cannot be written, e.g. in a read only directory or on a full disk,
+# the table is simply not cached.
+def write_cache(df, table_path):
+    temporary_path = "{}.{}.tmp".format(table_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(table_path), exist_ok=True)
+        try:
+            feather.write_feather(df, temporary_path, compression="uncompressed")
+            os.replace(temporary_path, table_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+    except OSError:
+        pass
@@ -0,0 +1,78 @@
+import numpy as np
+
+# Constants
+LTTB = "lttb"
+MIN_MAX = "min_max"
+# Points kept per pixel of figure width, min/max bucketing keeps a minimum and a maximum per pixel
+POINTS_PER_PIXEL = 2
+
+
+# Number of points of a line that are drawn on a figure of the given width in pixels
+def point_budget(width, points_per_pixel=POINTS_PER_PIXEL):
+    return max(3, int(width) * points_per_pixel)
+
+
+# Indices of the points kept by Largest-Triangle-Three-Buckets. The first and last point are always kept, the points
+# in between are split into n_out - 2 buckets. From each bucket the point forming the largest triangle with the point
+# kept from the previous bucket and the mean of the next bucket is kept.
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    kept = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        # twice the area of the triangles, the factor does not change the maximum
+        area = np.abs(
+            (x[kept] - mean_x) * (y[start:end] - y[kept])
+            - (x[kept] - x[start:end]) * (mean_y - y[kept])
+        )
+        kept = start + int(np.argmax(area))
+        indices[i + 1] = kept
+    return indices
+
+
+# Indices of the points kept by min/max bucketing: the points are split into n_out / 2 buckets of equal size and the
+# minimum and maximum of each bucket are kept in their original order, so peaks are never lost.
+def min_max(x, y, n_out):
+    n = len(x)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    # the last buckets can consist of padding only, they keep no points
+    filled = ~np.isnan(padded).all(axis=1)
+    offsets = np.arange(buckets)[filled] * size
+    minima = offsets + np.nanargmin(padded[filled], axis=1)
+    maxima = offsets + np.nanargmax(padded[filled], axis=1)
+    return np.unique(np.concatenate([minima, maxima]))
+
+
+# Decimate the columns of a source to the point budget of a figure of the given width. The x column has to be sorted.
+# With x_range only the visible points, plus one on each side so the line reaches the border, are decimated.
+def decimate(data, width, method=LTTB, x_range=None, x="x", y="y"):
+    x_values = np.asarray(data[x])
+    start, end = 0, len(x_values)
+    if x_range is not None:
+        start = max(0, np.searchsorted(x_values, x_range[0]) - 1)
+        end = min(len(x_values), np.searchsorted(x_values, x_range[1], "right") + 1)
+
+    select = lttb if method == LTTB else min_max
+    indices = start + select(
+        x_values[start:end], np.asarray(data[y])[start:end], point_budget(width)
+    )
+    return {column: np.asarray(values)[indices] for column, values in data.items()}
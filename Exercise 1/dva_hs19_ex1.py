@@ -1,26 +1,87 @@
-import numpy as np
-import numpy.polynomial.polynomial as poly
-import pandas as pd
 import os
-from scipy import interpolate
+import sys
+import time
+from bokeh.events import LODEnd, Reset
 from bokeh.layouts import layout
-from bokeh.io import show
-from bokeh.models import ColumnDataSource, HoverTool
+from bokeh.io import curdoc, show
+from bokeh.models import (
+    CheckboxGroup,
+    ColumnDataSource,
+    Div,
+    Slider,
+    TextInput,
+)
 from bokeh.plotting import figure
 from bokeh.palettes import RdYlBu
 from bokeh.transform import dodge
-from numpy.polynomial.polynomial import polyvander
 
-# CONSTANTS
-MAXIMUM_YEAR = 2016
-MINIMUM_VALUE = 10
+from births import (
+    DATASET,
+    MAXIMUM_YEAR,
+    MINIMUM_VALUE,
+    all_births_per_year,
+    clean_births,
+    load_births,
+)
+from decimation import decimate
+from fitting import curve_x, evaluate_polynomials, fit_errors, fit_polynomials
 
+# instrumentation is shared by both dashboards and lives in the directory above the exercises
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from instrumentation import Recorder, session_name
+from interpolation import barycentric_interpolate, barycentric_weights
+from names import TOP_NAMES, name_index
 
-# read data from .csv file by using absolute path
-__file__ = "20151001_hundenamen.csv"
+# CONSTANTS
+PLOT_WIDTH = 1500
+# Degrees that can be fitted in the live dashboard
+AVAILABLE_DEGREES = list(range(1, 7))
+GENDER_LABELS = {"m": "Male", "w": "Female"}
+
+# The lines of plot 1 are decimated to the pixel width of the figure before they are sent to the browser. The full data
+# of every decimated source is kept by the id of the source, in a bokeh server the visible range is decimated again
+# when the user zooms.
+decimated_sources = {}
+zoom_range = None
+# Time, memory and bytes sent per stage, only recorded when instrumentation is switched on
+recorder = Recorder(session_name(curdoc()))
+recorder.watch(curdoc())
+
+
+# Set the data of a decimated source, a new source is created if none is given
+def decimated_source(data, source=None):
+    if source is None:
+        source = ColumnDataSource()
+    decimated_sources[source.id] = (source, data)
+    source.data = decimate(data, PLOT_WIDTH, x_range=zoom_range)
+    return source
+
+
+# Decimate the visible range again once the user stopped zooming or panning plot 1 or reset it. The browser syncs
+# both ends of the range before the event, nothing is sent when the range did not change.
+def redecimate(event):
+    global zoom_range
+
+    if plot_1.x_range.start is None or plot_1.x_range.end is None:
+        return
+    if (plot_1.x_range.start, plot_1.x_range.end) == zoom_range:
+        return
+    zoom_range = (plot_1.x_range.start, plot_1.x_range.end)
+    for source, data in decimated_sources.values():
+        source.data = decimate(data, PLOT_WIDTH, x_range=zoom_range)
+
+
+# read data from .csv file by using absolute path. The file is streamed in chunks, only the years of birth are parsed
+# and the births per year of the dogs born before MAXIMUM_YEAR are counted while reading. The cleaned table is cached,
+# later runs load it from the cache as long as the file and the constants stay the same.
+__file__ = DATASET
 data_absolute_dirpath = os.path.abspath(os.path.dirname(__file__))
+dataset_path = os.path.join(data_absolute_dirpath, __file__)
 try:
-    df1 = pd.read_csv(os.path.join(data_absolute_dirpath, __file__))
+    with recorder.stage("parse"):
+        df = load_births(dataset_path, MAXIMUM_YEAR, MINIMUM_VALUE)
 except FileNotFoundError:
     print(
         "Couldn't find the dataset file, please check that you have the file in the same folder as the script"
@@ -30,19 +91,6 @@ except:
     print("Something went wrong while opening the dataset file...")
     exit()
 
-# rename the columns of the data frame
-df1.rename(
-    columns={
-        "HUNDENAME": "name",
-        "GEBURTSJAHR_HUND": "birth_year",
-        "GESCHLECHT_HUND": "gender",
-    },
-    inplace=True,
-)
-
-# Count the nr of births per year
-nr_of_births_per_year = df1.groupby("birth_year").size()
-
 # ====================================================================
 # =============== 1. data cleaning and basic plotting ================
 # ====================================================================
@@ -54,13 +102,10 @@ nr_of_births_per_year = df1.groupby("birth_year").size()
 # reference dataframe: https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.html
 # reference columndatasource: https://bokeh.pydata.org/en/latest/docs/reference/models/sources.html
 
-df1 = df1.loc[df1["birth_year"] < MAXIMUM_YEAR]
-nr_of_births_per_year = df1.groupby("birth_year").size()[lambda x: x > MINIMUM_VALUE]
-df = pd.DataFrame(
-    {"Years": nr_of_births_per_year.index, "Numbers": nr_of_births_per_year.values}
-)
+# The outliers are removed by load_births, df only contains the years before MAXIMUM_YEAR with more than MINIMUM_VALUE
+# births
 
-clean_column_data_source = ColumnDataSource(
+clean_column_data_source = decimated_source(
     dict(x=df["Years"], y=df["Numbers"], sizes=df["Numbers"] / 20)
 )
 
@@ -69,9 +114,11 @@ clean_column_data_source = ColumnDataSource(
 # latest year contained in your cleaned source data. These will be your x values for the plotting of the interpolation.
 # hint: use numpys linspace() function for this task
 # the array should look similar to this: array([start, ... , 1999.1, 1999.2, ... , 2014.7, 2014.8, ... , end])
+# The curves are only drawn, so the x values are spaced to the width of plot 1 instead of 0.1 years. The fitting errors
+# are computed at the years of the data.
 start_year = df["Years"].iloc[0]
-end_year = df["Years"].iloc[-1] + 0.1
-x_values = np.arange(start_year, end_year, 0.1, float)
+end_year = df["Years"].iloc[-1]
+x_values = curve_x(start_year, end_year, PLOT_WIDTH)
 
 
 # task 1.3: configure mouse hover tool
@@ -86,7 +133,7 @@ tooltip = [("Year", "@x"), ("Number", "@y")]
 # title and remember to add the hovertool. For the diamond glyphs, set preferred values for size, color and alpha
 # optional task: set the size of the glyphs such that they adapt it according to their 'Numbers' value
 plot_1 = figure(
-    plot_width=1500,
+    plot_width=PLOT_WIDTH,
     plot_height=500,
     title="Number of dog births per year",
     tools="hover",
@@ -107,7 +154,7 @@ plot_1.diamond(
 
 # task 1.5: generate the figure for plot 2 with proper settings for x_range, x and y axis label, plot_height,
 # plot_width and title
-plot_2 = figure(plot_width=1500, plot_height=200, title="Error bars")
+plot_2 = figure(plot_width=PLOT_WIDTH, plot_height=200, title="Error bars")
 plot_2.yaxis.axis_label = "Fitting Error"
 
 # ======================================================================
@@ -126,26 +173,20 @@ plot_1.line(
     legend="Piecewise linear interpolation",
 )
 
-# task 2.2: draw fitting lines in plot 1 and error bars in plot 2 using the following for loop. You should fit curves
-# of degree 2, 4 and 6 to the points. The range of the for loop is already configured this way.
-for i in range(2, 7, 2):
-    # degree of each polynomial fitting
-    degree = i
+
+# Draw the fitting curve of a degree into plot 1 and its error bars into plot 2, the renderers are returned
+def draw_fit(degree, fitting_curve, error, x_pos):
     # color used in both fitting curves and error bars
     color = RdYlBu[11][4 + degree]
-    # hint: use numpys polyfit() to calculate fitting coefficients and polyval() to calculate estimated y values for
-    # the x values you constructed before.
-    fitting_coefficient = np.polyfit(df["Years"], df["Numbers"], i)
-    fitting_curve = np.polyval(fitting_coefficient, x_values)
 
     # hint: construct new ColumnDataSource for fitting curve, x should be the constructed x values and
     # y should be the estimated y. Then draw the fitting line into plot 1, add proper legend, color, line_width and
     # line_alpha
-    fitting_curve_column_data_source = ColumnDataSource(
+    fitting_curve_column_data_source = decimated_source(
         dict(x=x_values, y=fitting_curve)
     )
-    legend = "Polynomial Least-Squares Interpolation: Fitting Degree = " + str(i)
-    plot_1.line(
+    legend = "Polynomial Least-Squares Interpolation: Fitting Degree = " + str(degree)
+    line = plot_1.line(
         x="x",
         y="y",
         source=fitting_curve_column_data_source,
@@ -156,18 +197,8 @@ for i in range(2, 7, 2):
     )
 
     # draw the error bars into plot 2
-    # hint: calculate the fitting error for each year by subtracting the original 'Numbers' value off your cleaned
-    # source from the estimated y values. Be careful to match the correct y estimation to the respective 'Numbers'
-    # value! For the subsampling look up array slicing for numpy arrays. Use the absolute values of the errors to only
-    # get error bars above the baseline.
-    y_estimate = fitting_curve[0 : len(x_values) : 10]
-    error = abs(df["Numbers"] - y_estimate)
     error_data_source = ColumnDataSource(dict(x=df["Years"], y=error))
-
-    # hint: before plotting, make sure the bars don't overlap each other, i.e. slightly adjust the x position for each
-    # bar within each loop cycle
-    x_pos = 0.1 * (i / 2 - 1)
-    plot_2.vbar(
+    bars = plot_2.vbar(
         x=dodge("x", x_pos),
         top="y",
         source=error_data_source,
@@ -175,6 +206,37 @@ for i in range(2, 7, 2):
         alpha=0.8,
         color=color,
     )
+    return line, bars
+
+
+# task 2.2: draw fitting lines in plot 1 and error bars in plot 2 using the following for loop. You should fit curves
+# of degree 2, 4 and 6 to the points. The range of the for loop is already configured this way.
+# All degrees are fitted with one factorization on the scaled years and evaluated on the x values in one product.
+degrees = list(range(2, 7, 2))
+with recorder.stage("polyfit"):
+    fitting_coefficients, domain = fit_polynomials(df["Years"], df["Numbers"], degrees)
+    fitting_curves = evaluate_polynomials(fitting_coefficients, domain, x_values)
+    fitting_errors = fit_errors(
+        fitting_coefficients, domain, df["Years"], df["Numbers"]
+    )
+# line and error bars of each degree
+fit_renderers = {}
+for i in degrees:
+    # hint: use numpys polyfit() to calculate fitting coefficients and polyval() to calculate estimated y values for
+    # the x values you constructed before.
+    fitting_curve = fitting_curves[:, degrees.index(i)]
+
+    # hint: calculate the fitting error for each year by subtracting the original 'Numbers' value off your cleaned
+    # source from the estimated y values. Be careful to match the correct y estimation to the respective 'Numbers'
+    # value! For the subsampling look up array slicing for numpy arrays. Use the absolute values of the errors to only
+    # get error bars above the baseline.
+    error = fitting_errors[:, degrees.index(i)]
+
+    # hint: before plotting, make sure the bars don't overlap each other, i.e. slightly adjust the x position for each
+    # bar within each loop cycle
+    x_pos = 0.1 * degrees.index(i)
+    fit_renderers[i] = draw_fit(i, fitting_curve, error, x_pos)
+
 # task 2.3: draw a 6th degree smooth polynomial interpolation into plot 1
 # hint 1: since most good math libraries use the least square method or similarly stable interpolation approaches you
 # have to do this manually. Have a look at the lecture slides DVA 02 page 22 and use numpys (multi dimensional) array
@@ -182,27 +244,21 @@ for i in range(2, 7, 2):
 # method shown in the lecture, you are welcome to use it.
 # hint 2: Use the entries 0, 3, 6, 9, 12, 15 of the original column data source
 
-# start by constructing your x and y values from the source
-degree = 6
-x_val = clean_column_data_source.data["x"][0:16:3]
-y_val = clean_column_data_source.data["y"][0:16:3]
-
-# generate a 6x6 matrix filled with 1
-V = np.ones((6, 6))
-# use array slicing and the power function to fill columns 2-6 of the matrix with the correct values
-for i in range(0, degree - 1):
-    V[:, i] = np.power(x_val, degree - 1 - i)
+# start by constructing your x and y values from the source. The source can be decimated, the entries are taken from
+# the cleaned data frame it was built from.
+x_val = df["Years"][0:16:3]
+y_val = df["Numbers"][0:16:3]
 
+# The interpolating polynomial is the solution of the Vandermonde system from the slides. Instead of solving it for the
+# raw powers of the years, which is badly conditioned, it is evaluated with the barycentric Lagrange formula on the
+# scaled years. This works for any number of nodes.
+weights = barycentric_weights(x_val)
+# estimate y values for the x values from task 2.1 and plot the result into plot 1
+smooth_fitting_curve_y = barycentric_interpolate(x_val, y_val, x_values, weights)
 
-# solve the equation from the slides with the correct numpy functions
-coefficients = np.linalg.solve(V, y_val)
-# use polyval and the x values from task 2.1 together with the calculated coefficients to estimate y values and then
-# plot the result into plot 1
-smooth_fitting_curve_y = np.polyval(coefficients, x_values)
 
-
-smooth_fitting_curve = ColumnDataSource(dict(x=x_values, y=smooth_fitting_curve_y))
-plot_1.line(
+smooth_fitting_curve = decimated_source(dict(x=x_values, y=smooth_fitting_curve_y))
+smooth_line = plot_1.line(
     x="x",
     y="y",
     source=smooth_fitting_curve,
@@ -210,13 +266,13 @@ plot_1.line(
     color="blue",
 )
 # draw the error bars for this polynomial again into plot 2
-y_estimate = smooth_fitting_curve_y[0 : len(x_values) : 10]
+y_estimate = barycentric_interpolate(x_val, y_val, df["Years"], weights)
 error = abs(df["Numbers"] - y_estimate)
 error_data_source = ColumnDataSource(dict(x=df["Years"], y=error))
 
 # move the x positions such that the new bars are to the right of the previous ones
-x_pos = 0.1 * (8 / 2 - 1)
-plot_2.vbar(
+x_pos = 0.1 * len(degrees)
+smooth_bars = plot_2.vbar(
     x=dodge("x", x_pos),
     top="y",
     source=error_data_source,
@@ -228,6 +284,40 @@ plot_2.vbar(
 # set up the position of legend in plot 1 as you like
 plot_1.legend.location = "top_left"
 
+# ======================================================================
+# ============================ 3. dog names ============================
+# ======================================================================
+
+# The most common names of the dogs born before MAXIMUM_YEAR, split by gender. The names are queried from an index built
+# while streaming the dataset instead of grouping the raw data again.
+names = name_index(dataset_path)
+top_names = names.top_names(TOP_NAMES, years=(0, MAXIMUM_YEAR))
+top_names_source = ColumnDataSource(top_names.to_dict("list"))
+
+name_tooltip = [("Name", "@name"), ("Births", "@births")]
+name_tooltip += [
+    (GENDER_LABELS.get(gender, gender), "@" + gender) for gender in names.genders
+]
+plot_3 = figure(
+    y_range=list(reversed(top_names["name"])),
+    plot_width=PLOT_WIDTH,
+    plot_height=300,
+    title="Most common dog names",
+    tools="hover",
+    tooltips=name_tooltip,
+)
+plot_3.xaxis.axis_label = "Number of Dogs"
+plot_3.hbar_stack(
+    list(names.genders),
+    y="name",
+    height=0.8,
+    source=top_names_source,
+    color=["navy", "firebrick"][: len(names.genders)],
+    alpha=0.8,
+    legend_label=[GENDER_LABELS.get(gender, gender) for gender in names.genders],
+)
+plot_3.legend.location = "bottom_right"
+
 # ==============================================
 # ================= dashboard ==================
 # ==============================================
@@ -237,6 +327,200 @@ plot_1.legend.location = "top_left"
 # fill in the function
 
 
-dashboard = layout([[plot_1], [plot_2]])
+dashboard = layout([[plot_1], [plot_2], [plot_3]])
+
+# ==============================================
+# =============== live dashboard ===============
+# ==============================================
 
-show(dashboard)
+# With bokeh serve the dashboard gets controls for the cleaning constants and the fitted degrees. A change only
+# recomputes what depends on it: the constants change the cleaned data and with it every fit, a degree only its own
+# curve and error bars. Only the sources of these renderers are updated. The births per year of all years are loaded
+# once and shared by all sessions.
+max_year_slider = Slider(
+    start=2000, end=2017, value=MAXIMUM_YEAR, step=1, title="Maximum year"
+)
+min_value_slider = Slider(
+    start=0, end=100, value=MINIMUM_VALUE, step=1, title="Minimum births per year"
+)
+degree_checkboxes = CheckboxGroup(
+    labels=[str(degree) for degree in AVAILABLE_DEGREES],
+    active=[AVAILABLE_DEGREES.index(degree) for degree in degrees],
+    inline=True,
+)
+name_input = TextInput(title="Names starting with")
+latency_div = Div(text="")
+# Legend items of all lines drawn so far, also of the hidden ones
+legend_items = []
+# Server side time in seconds of every change, by control
+latencies = {}
+# Shown below the latency of the last change while the cleaned data cannot be plotted
+data_message = ""
+
+
+# Recompute the cleaned data and everything drawn from it. With fewer than two years left nothing can be interpolated
+# or fitted, the curves and error bars are emptied instead of showing the previous data.
+def update_data():
+    global df, x_values, data_message
+
+    with recorder.stage("parse"):
+        counts = all_births_per_year(dataset_path)
+    with recorder.stage("groupby"):
+        counts = counts[counts.index < max_year_slider.value]
+        df = clean_births(counts, min_value_slider.value)
+
+    decimated_source(
+        dict(x=df["Years"], y=df["Numbers"], sizes=df["Numbers"] / 20),
+        clean_column_data_source,
+    )
+    if len(df) < 2:
+        data_message = (
+            "Only {} years before {} with more than {} births, nothing to fit".format(
+                len(df), max_year_slider.value, min_value_slider.value
+            )
+        )
+        clear_curves()
+        return
+
+    data_message = ""
+    x_values = curve_x(df["Years"].iloc[0], df["Years"].iloc[-1], PLOT_WIDTH)
+    update_fits(degrees)
+    update_smooth()
+
+
+# Empty the fitting curves, the smooth interpolation and their error bars
+def clear_curves():
+    for line, bars in list(fit_renderers.values()) + [(smooth_line, smooth_bars)]:
+        decimated_source(dict(x=[], y=[]), line.data_source)
+        bars.data_source.data = dict(x=[], y=[])
+
+
+# Fit the given degrees to the cleaned data and update their curves and error bars. Degrees that need more points than
+# there are years are hidden.
+def update_fits(fit_degrees):
+    fitted = [degree for degree in fit_degrees if degree < len(df)]
+    for degree in fit_degrees:
+        if degree not in fitted and degree in fit_renderers:
+            for renderer in fit_renderers[degree]:
+                renderer.visible = False
+    if not fitted:
+        return
+
+    with recorder.stage("polyfit"):
+        coefficients, domain = fit_polynomials(df["Years"], df["Numbers"], fitted)
+        curves = evaluate_polynomials(coefficients, domain, x_values)
+        errors = fit_errors(coefficients, domain, df["Years"], df["Numbers"])
+    for k, degree in enumerate(fitted):
+        if degree not in fit_renderers:
+            fit_renderers[degree] = draw_fit(degree, curves[:, k], errors[:, k], 0)
+            continue
+        line, bars = fit_renderers[degree]
+        decimated_source(dict(x=x_values, y=curves[:, k]), line.data_source)
+        bars.data_source.data = dict(x=df["Years"], y=errors[:, k])
+        line.visible = bars.visible = True
+
+
+# Interpolate the nodes of task 2.3 again
+def update_smooth():
+    x_val = df["Years"][0:16:3]
+    y_val = df["Numbers"][0:16:3]
+    weights = barycentric_weights(x_val)
+    decimated_source(
+        dict(x=x_values, y=barycentric_interpolate(x_val, y_val, x_values, weights)),
+        smooth_line.data_source,
+    )
+    y_estimate = barycentric_interpolate(x_val, y_val, df["Years"], weights)
+    smooth_bars.data_source.data = dict(
+        x=df["Years"], y=abs(df["Numbers"] - y_estimate)
+    )
+
+
+# Place the error bars of the shown degrees next to each other, followed by the ones of the smooth interpolation. Only
+# the offsets that change are sent. The legend only lists the shown lines.
+def place_bars():
+    shown = [degree for degree in degrees if fit_renderers[degree][1].visible]
+    offsets = [
+        (fit_renderers[degree][1], 0.1 * rank) for rank, degree in enumerate(shown)
+    ]
+    for bars, x_pos in offsets + [(smooth_bars, 0.1 * len(shown))]:
+        if bars.glyph.x["transform"].value != x_pos:
+            bars.glyph.x["transform"].value = x_pos
+
+    legend = plot_1.legend[0]
+    legend_items.extend(item for item in legend.items if item not in legend_items)
+    shown_items = [item for item in legend_items if item.renderers[0].visible]
+    if shown_items != legend.items:
+        legend.items = shown_items
+
+
+# Query the most common names starting with the entered prefix, born before the maximum year
+def update_names():
+    top_names = names.top_names(
+        TOP_NAMES, name_input.value.strip(), (0, max_year_slider.value)
+    )
+    top_names_source.data = top_names.to_dict("list")
+    plot_3.y_range.factors = list(reversed(top_names["name"]))
+
+
+def change_constants(attr, old, new):
+    update_data()
+    place_bars()
+    update_names()
+
+
+def change_names(attr, old, new):
+    update_names()
+
+
+def change_degrees(attr, old, new):
+    global degrees
+
+    new_degrees = [AVAILABLE_DEGREES[index] for index in sorted(new)]
+    for degree in degrees:
+        if degree not in new_degrees:
+            for renderer in fit_renderers[degree]:
+                renderer.visible = False
+    added = [degree for degree in new_degrees if degree not in degrees]
+    degrees = new_degrees
+    update_fits(added)
+    place_bars()
+
+
+# Wrap a callback to measure how long the server takes to handle a change of a control
+def measured(control, callback):
+    def measured_callback(attr, old, new):
+        start = time.perf_counter()
+        with recorder.stage(control):
+            callback(attr, old, new)
+        latency = time.perf_counter() - start
+        latencies.setdefault(control, []).append(latency)
+        latency_div.text = "Change {}: {} updated in {:.1f} ms".format(
+            sum(map(len, latencies.values())), control, latency * 1e3
+        )
+        if data_message:
+            latency_div.text += "<br>" + data_message
+
+    return measured_callback
+
+
+# Only a bokeh server can call back into python when the user zooms or changes a control
+if curdoc().session_context is None:
+    show(dashboard)
+else:
+    zoom_callback = recorder.wrap("Zoom", redecimate)
+    plot_1.on_event(LODEnd, zoom_callback)
+    plot_1.on_event(Reset, zoom_callback)
+    max_year_slider.on_change(
+        "value_throttled", measured("Maximum year", change_constants)
+    )
+    min_value_slider.on_change(
+        "value_throttled", measured("Minimum births", change_constants)
+    )
+    degree_checkboxes.on_change("active", measured("Degrees", change_degrees))
+    name_input.on_change("value", measured("Names", change_names))
+
+    controls = [max_year_slider, min_value_slider, degree_checkboxes, name_input]
+    rows = [controls + [latency_div], [plot_1], [plot_2], [plot_3]]
+    if recorder.enabled:
+        rows.append([recorder.table(curdoc())])
+    curdoc().add_root(layout(rows))
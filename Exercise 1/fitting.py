@@ -0,0 +1,89 @@
+import numpy as np
+from numpy.polynomial.polynomial import polyvander
+from scipy.linalg import qr, solve_triangular
+
+# Constants
+# Horizontal distance in pixels between the points of a curve drawn on a figure
+CURVE_PIXELS = 5
+
+
+# Map the x values of [lower, upper] onto [-1, 1], the powers of the scaled values stay of order one instead of growing
+# like 2000^degree for years
+def scale_to_domain(x, domain):
+    lower, upper = domain
+    if upper == lower:
+        return np.zeros_like(np.asarray(x, dtype=float))
+    return (2 * np.asarray(x, dtype=float) - (lower + upper)) / (upper - lower)
+
+
+# Least squares fits of polynomials of all given degrees to one or many series in one go. y is a vector or a matrix with
+# one series per column. A single QR factorization of the scaled Vandermonde matrix of the highest degree is shared by
+# all degrees: the first d + 1 columns of Q and R give the fit of degree d. Returns the coefficients in increasing
+# powers of the scaled x, with shape (max degree + 1, degrees[, series]) and zeros above each degree, and the domain
+# that was used for scaling.
+def fit_polynomials(x, y, degrees):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    degrees = np.atleast_1d(degrees)
+    max_degree = int(degrees.max())
+    if max_degree >= len(x):
+        raise ValueError(
+            "Fitting degree {} needs more than {} points".format(max_degree, len(x))
+        )
+
+    domain = (x.min(), x.max())
+    q, r = qr(polyvander(scale_to_domain(x, domain), max_degree), mode="economic")
+    projected = q.T @ y.reshape(len(x), -1)
+
+    coefficients = np.zeros((max_degree + 1, len(degrees), projected.shape[1]))
+    for i, degree in enumerate(degrees):
+        n = degree + 1
+        coefficients[:n, i] = solve_triangular(r[:n, :n], projected[:n])
+
+    if y.ndim == 1:
+        coefficients = coefficients[:, :, 0]
+    return coefficients, domain
+
+
+# Evaluate polynomials fitted by fit_polynomials at the x values with one matrix product. The result has one row per x
+# value followed by the remaining axes of the coefficients.
+def evaluate_polynomials(coefficients, domain, x):
+    vander = polyvander(scale_to_domain(x, domain), coefficients.shape[0] - 1)
+    return np.tensordot(vander, coefficients, axes=1)
+
+
+# Absolute errors of fitted polynomials at the observed x values, with one row per x value followed by the remaining
+# axes of the coefficients. The polynomials are only evaluated at the data, independent of the curves drawn.
+def fit_errors(coefficients, domain, x, y):
+    y = np.asarray(y, dtype=float)
+    fitted = evaluate_polynomials(coefficients, domain, x)
+    return np.abs(fitted - y.reshape(y.shape[:1] + (1,) + y.shape[1:]))
+
+
+# x values to draw a curve between start and end on a figure of the given width in pixels, one point every
+# pixels_per_point pixels
+def curve_x(start, end, width, pixels_per_point=CURVE_PIXELS):
+    return np.linspace(start, end, max(2, int(width) // pixels_per_point))
+
+
+# Fit polynomials of the given degrees to every column of a table with one row per year, such as the result of
+# births.births_table, with one batched least squares solve. Returns a dict with the coefficients and domain, the fitted
+# values and the absolute errors at the years, both of shape (years, degrees, groups), and the curves evaluated at
+# x_values if they are given.
+def fit_groups(table, degrees, x_values=None):
+    x = table.index.to_numpy(dtype=float)
+    y = table.to_numpy(dtype=float)
+    coefficients, domain = fit_polynomials(x, y, degrees)
+    fitted = evaluate_polynomials(coefficients, domain, x)
+
+    fit = {
+        "groups": list(table.columns),
+        "degrees": list(np.atleast_1d(degrees)),
+        "coefficients": coefficients,
+        "domain": domain,
+        "fitted": fitted,
+        "errors": np.abs(fitted - y[:, None, :]),
+    }
+    if x_values is not None:
+        fit["curves"] = evaluate_polynomials(coefficients, domain, x_values)
+    return fit
@@ -0,0 +1,48 @@
+import numpy as np
+from scipy import interpolate
+
+from fitting import scale_to_domain
+
+
+# Barycentric weights of the interpolation nodes x, which have to be distinct. The weights are computed on the nodes
+# scaled to [-1, 1] and in the log domain, then normalized by the largest one: the products of the distances under- or
+# overflow for a few hundred nodes otherwise. A common factor of all weights does not change the interpolant.
+def barycentric_weights(x):
+    t = scale_to_domain(x, (np.min(x), np.max(x)))
+    distances = t[:, None] - t[None, :]
+    np.fill_diagonal(distances, 1)
+    log_weights = -np.log(np.abs(distances)).sum(axis=1)
+    signs = np.prod(np.sign(distances), axis=1)
+    return signs * np.exp(log_weights - log_weights.max())
+
+
+# Evaluate the polynomial interpolating the points (x, y) at x_values with the barycentric Lagrange formula. Costs
+# O(n^2) once for the weights and O(n) per evaluated point, weights of earlier calls with the same nodes can be passed.
+def barycentric_interpolate(x, y, x_values, weights=None):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if weights is None:
+        weights = barycentric_weights(x)
+
+    domain = (x.min(), x.max())
+    t = scale_to_domain(x, domain)
+    t_values = np.atleast_1d(scale_to_domain(x_values, domain))
+    differences = t_values[:, None] - t[None, :]
+
+    # at the nodes the formula divides by zero, the interpolant is the node value there
+    exact = differences == 0
+    differences[exact] = 1
+    terms = weights / differences
+    values = (terms @ y) / terms.sum(axis=1)
+    rows, columns = np.nonzero(exact)
+    values[rows] = y[columns]
+    return values
+
+
+# Evaluate the cubic spline through the points (x, y) at x_values, with natural boundary conditions by default. The
+# spline is built in O(n) and evaluated in O(log n) per point.
+def spline_interpolate(x, y, x_values, bc_type="natural"):
+    spline = interpolate.CubicSpline(
+        np.asarray(x, dtype=float), np.asarray(y, dtype=float), bc_type=bc_type
+    )
+    return spline(x_values)
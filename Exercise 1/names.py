@@ -0,0 +1,112 @@
+import numpy as np
+import os
+import pandas as pd
+import pyarrow.feather as feather
+
+from births import CHUNK_ROWS, births_per_year, cache_key, cache_path, write_cache
+
+# Constants
+TOP_NAMES = 10
+# Columns the births are counted by, besides the year of birth
+GROUPS = ["name", "gender"]
+# Sorts after every character used in names, closes the range of names starting with a prefix
+LAST_CHARACTER = "\U0010ffff"
+
+# Name indexes by (path, modification time) of the dataset
+name_index_cache = {}
+
+
+# Index of the names in the dog registry, built from the births counted per year, name and gender. Each name is stored
+# once and identified by its code, its position in the case-insensitive sort order of the names. The names starting
+# with a prefix are then a range of codes found with two binary searches. The births are kept in a dense
+# gender x year x name matrix, so top-N and filter queries are slices and sums of this matrix.
+class NameIndex:
+    def __init__(self, counts):
+        index = counts.index
+        names = index.get_level_values(1).astype(str)
+        unique_names = pd.unique(names)
+        keys = np.array([name.casefold() for name in unique_names])
+        order = np.argsort(keys, kind="stable")
+        self.names = unique_names[order]
+        self.keys = keys[order]
+
+        self.years = np.unique(index.get_level_values(0))
+        self.genders = np.unique(index.get_level_values(2).astype(str))
+        name_codes = pd.Index(self.names).get_indexer(names)
+        year_codes = np.searchsorted(self.years, index.get_level_values(0))
+        gender_codes = np.searchsorted(
+            self.genders, index.get_level_values(2).astype(str)
+        )
+        self.counts = np.zeros(
+            (len(self.genders), len(self.years), len(self.names)), dtype=np.int64
+        )
+        self.counts[gender_codes, year_codes, name_codes] = counts.to_numpy()
+
+    # Build the index while streaming the dataset
+    @classmethod
+    def from_dataset(cls, path, chunksize=CHUNK_ROWS):
+        return cls(births_per_year(path, np.iinfo(np.int16).max, chunksize, by=GROUPS))
+
+    # Range of the codes of the names starting with prefix, ignoring case
+    def prefix_codes(self, prefix):
+        key = prefix.casefold()
+        start = np.searchsorted(self.keys, key, "left")
+        stop = np.searchsorted(self.keys, key + LAST_CHARACTER, "left")
+        return start, stop
+
+    # Births per gender and name of the years in [start, stop), or all years
+    def gender_counts(self, years=None):
+        if years is None:
+            return self.counts.sum(axis=1)
+        start, stop = np.searchsorted(self.years, years)
+        return self.counts[:, start:stop].sum(axis=1)
+
+    # The n names with the most births among the names starting with prefix, in the years in [start, stop) or all years.
+    # The data frame has the births of each name in total and per gender.
+    def top_names(self, n=TOP_NAMES, prefix="", years=None):
+        start, stop = self.prefix_codes(prefix)
+        by_gender = self.gender_counts(years)[:, start:stop]
+        totals = by_gender.sum(axis=0)
+        if n < len(totals):
+            top = np.argpartition(-totals, n)[:n]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.lexsort((top, -totals[top]))]
+
+        top_names = pd.DataFrame(
+            {"name": self.names[start + top], "births": totals[top]}
+        )
+        for g, gender in enumerate(self.genders):
+            top_names[gender] = by_gender[g, top]
+        return top_names
+
+    # Births per year of one name, all genders together
+    def name_counts(self, name):
+        code = pd.Index(self.names).get_indexer([name])[0]
+        if code < 0:
+            return pd.Series(0, index=self.years, name=name)
+        return pd.Series(
+            self.counts[:, :, code].sum(axis=0), index=self.years, name=name
+        )
+
+
+# Births per year, name and gender of a dataset. Like births.load_births, the counts are cached as a Feather file next
+# to the dataset, later runs read them instead of parsing the CSV again.
+def load_name_counts(path, chunksize=CHUNK_ROWS):
+    maximum_year = np.iinfo(np.int16).max
+    table_path = cache_path(path, cache_key(path, maximum_year, by=GROUPS))
+    if os.path.exists(table_path):
+        table = feather.read_feather(table_path)
+        return table.set_index(["birth_year"] + GROUPS)["births"]
+
+    counts = births_per_year(path, maximum_year, chunksize, by=GROUPS)
+    write_cache(counts.rename("births").reset_index(), table_path)
+    return counts
+
+
+# Name index of a dataset, kept in memory per file and modification time like births.all_births_per_year
+def name_index(path):
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in name_index_cache:
+        name_index_cache[key] = NameIndex(load_name_counts(path))
+    return name_index_cache[key]
@@ -0,0 +1,180 @@
+import argparse
+import json
+import numpy as np
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from PIL import Image
+
+from image_processing import (
+    FAST_MEDIAN,
+    GAUSS,
+    MEDIAN,
+    blue_channel,
+    filter_image,
+    green_channel,
+    greyscale,
+    open_image,
+    red_channel,
+    salt_pepper_noise,
+)
+
+# Constants
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+OUTPUTS = ["noisy", "filtered", "greyscale", "red", "green", "blue"]
+# Order in which the stages run, used to print the timings
+STAGES = ["open", "noise", "filter", "greyscale", "channels", "write"]
+LOG_FILE = "batch.jsonl"
+# Fast zlib level, writing the outputs is several times faster than with the default level 6
+PNG_COMPRESSION = 1
+
+
+# Run the pipeline of the dashboard on one image without bokeh: add noise, filter the noisy image and compute the
+# greyscale and channel images. Only the requested outputs are computed and they are written to the output directory
+# right away, the result only holds the time spent per stage.
+def process_image(path, output_dir, spec, seed):
+    timings = {}
+    images = {}
+
+    def stage(name, compute):
+        start = time.perf_counter()
+        result = compute()
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+        return result
+
+    name, extension = os.path.splitext(path)
+    img, img_size = stage("open", lambda: open_image(name, extension))
+    outputs = spec["outputs"]
+
+    noisy = img
+    if spec["noise"] > 0:
+        noisy = stage(
+            "noise", lambda: salt_pepper_noise(img, img_size, spec["noise"], seed)
+        )
+        images["noisy"] = noisy
+    if "filtered" in outputs and spec["filter_value"] > 0:
+        # every process filters one image, the strips of the image are not filtered in parallel
+        images["filtered"] = stage(
+            "filter",
+            lambda: filter_image(noisy, spec["filter"], spec["filter_value"], 1),
+        )
+    if "greyscale" in outputs:
+        images["greyscale"] = stage("greyscale", lambda: greyscale(img))
+    for channel, extract in [
+        ("red", red_channel),
+        ("green", green_channel),
+        ("blue", blue_channel),
+    ]:
+        if channel in outputs:
+            images[channel] = stage("channels", lambda: extract(img))
+
+    stem = os.path.basename(name)
+    for output, image in images.items():
+        if output in outputs:
+            target = os.path.join(output_dir, "{}_{}.png".format(stem, output))
+            stage(
+                "write",
+                lambda: Image.fromarray(np.flipud(image)).save(
+                    target, compress_level=PNG_COMPRESSION
+                ),
+            )
+
+    return timings
+
+
+# Images of a directory, sorted by name
+def list_images(input_dir):
+    return sorted(
+        os.path.join(input_dir, file)
+        for file in os.listdir(input_dir)
+        if file.lower().endswith(EXTENSIONS)
+    )
+
+
+# Process all images on a pool of processes. At most max_in_flight images are submitted at once, so only that many
+# decoded images are in memory no matter how many images there are. Each finished image is logged as one JSON line in
+# the output directory. Returns the number of images, the wall time and the total time per stage.
+def run_batch(paths, output_dir, spec, workers=None, max_in_flight=None, seed=0):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    os.makedirs(output_dir, exist_ok=True)
+
+    totals = {}
+    start = time.perf_counter()
+    pending = {}
+    with ProcessPoolExecutor(workers) as pool, open(
+        os.path.join(output_dir, LOG_FILE), "w"
+    ) as log:
+        paths = iter(enumerate(paths))
+        done_count = 0
+        while True:
+            for index, path in paths:
+                future = pool.submit(
+                    process_image, path, output_dir, spec, seed + index
+                )
+                pending[future] = path
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                timings = future.result()
+                for name, seconds in timings.items():
+                    totals[name] = totals.get(name, 0) + seconds
+                log.write(json.dumps({"image": path, "timings": timings}) + "\n")
+                done_count += 1
+
+    return done_count, time.perf_counter() - start, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the image processing of the dashboard over a directory of images."
+    )
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument(
+        "--noise", type=float, default=0, help="percentage of noisy pixels"
+    )
+    parser.add_argument(
+        "--filter", choices=[MEDIAN, FAST_MEDIAN, GAUSS], default=MEDIAN
+    )
+    parser.add_argument(
+        "--filter-value", type=float, default=3, help="mask size or sigma, 0 to skip"
+    )
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUTS, default=["filtered"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--max-in-flight", type=int, default=None, help="images in memory at once"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = {
+        "noise": args.noise,
+        "filter": args.filter,
+        "filter_value": args.filter_value,
+        "outputs": args.outputs,
+    }
+    if args.filter != GAUSS:
+        spec["filter_value"] = int(args.filter_value)
+
+    paths = list_images(args.input_dir)
+    count, seconds, totals = run_batch(
+        paths, args.output_dir, spec, args.workers, args.max_in_flight, args.seed
+    )
+    print(
+        "{} images in {:.2f} s, {:.2f} images/s".format(count, seconds, count / seconds)
+    )
+    for name in STAGES:
+        if name in totals:
+            print(
+                "{:<10} {:>10.1f} ms per image".format(name, totals[name] / count * 1e3)
+            )
+
+
+if __name__ == "__main__":
+    main()
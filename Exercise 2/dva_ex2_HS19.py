@@ -1,16 +1,50 @@
+import logging
 import numpy as np
 import os
-import random
-from PIL import Image
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+from functools import partial
+from tornado import gen
 from bokeh.plotting import figure, curdoc, output_file
 from bokeh.layouts import column, row
+from bokeh.document import without_document_lock
+from bokeh.events import LODEnd, Reset
 from bokeh.models import Slider, Select, Button, CustomJS
-from bokeh.models import ColumnDataSource
-from scipy.ndimage.filters import gaussian_filter, median_filter
+from bokeh.models import ColumnDataSource, LinearColorMapper
+from image_processing import (
+    MEDIAN,
+    FAST_MEDIAN,
+    GAUSS,
+    RED,
+    GREEN,
+    BLUE,
+    build_pyramid,
+    channel_palette,
+    executor,
+    filter_cache,
+    filter_image,
+    image_cache,
+    pack_rgba,
+    pyramid_nbytes,
+    salt_pepper_noise,
+)
+
+# instrumentation is shared by both dashboards and lives in the directory above the exercises
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from instrumentation import Recorder, session_name
+
+# Start of this session, the time to first paint is measured from here
+session_start = time.perf_counter()
+# bokeh serve runs the script under a new module name per session and only sets the level of its own logger, the
+# dashboard logs under a fixed name at the level of the server
+log = logging.getLogger("dva_ex2_HS19")
+log.setLevel(logging.getLogger("bokeh").getEffectiveLevel())
 
 # Constants
-MEDIAN = "Median"
-GAUSS = "Gauss"
 ORIGINAL = "Original"
 FILTERED = "Filtered"
 NOISY = "Noisy"
@@ -18,91 +52,34 @@ BLUE_CHANNEL = "Blue Channel"
 GREEN_CHANNEL = "Green Channel"
 RED_CHANNEL = "Red CHannel"
 GREYSCALE = "Greyscale"
-GREYSCALE_WEIGHTS = {"red": 0.3, "green": 0.59, "blue": 0.11}
-# open and convert image to a usable format
-def open_image(name):
-    image = Image.open(os.path.abspath(name + ".jpg")).convert("RGBA")
-    xdim, ydim = image.size
-    orig = np.flipud(np.array(image))
-    return orig, [xdim, ydim]
-
-
-# Extract Red Channel from the image (set other channels to 0)
-def red_channel(img):
-    image = np.copy(img)
-    image[:, :, 1] *= 0
-    image[:, :, 2] *= 0
-    return image
-
-
-# Extract Green Channel from the image (set other channels to 0)
-def green_channel(img):
-    image = np.copy(img)
-    image[:, :, 0] *= 0
-    image[:, :, 2] *= 0
-    return image
-
-
-# Extract Blue Channel from the image (set other channels to 0)
-def blue_channel(img):
-    image = np.copy(img)
-    image[:, :, 0] *= 0
-    image[:, :, 1] *= 0
-    return image
-
-
-# Compute greyscale version by multiplying the different channels and merge them together
-def greyscale(img):
-    image = np.copy(img)
-
-    red = np.multiply(image[:, :, 0], GREYSCALE_WEIGHTS["red"])
-    green = np.multiply(image[:, :, 1], GREYSCALE_WEIGHTS["green"])
-    blue = np.multiply(image[:, :, 2], GREYSCALE_WEIGHTS["blue"])
-
-    image[:, :, 0] = red + green + blue
-    image[:, :, 1] = red + green + blue
-    image[:, :, 2] = red + green + blue
-    image[:, :, 3] = 255
-
-    return image
-
-
-# Add noise to an image
-def salt_pepper_noise(img, img_size, percentage):
-    image = np.copy(img)
-    black = [0, 0, 0, 255]
-    white = [255, 255, 255, 255]
-
-    for i in range(int(img_size[0] * img_size[1] / 100 * percentage)):
-        black_or_white = random.randint(0, 1)
-        x_pixel = random.randint(0, img_size[0] - 1)
-        y_pixel = random.randint(0, img_size[1] - 1)
-
-        if black_or_white:
-            image[y_pixel, x_pixel, :] = black
-        else:
-            image[y_pixel, x_pixel, :] = white
-
-    return image
+COMPUTING = "Computing…"
+# Pyramid levels sent to the figures: fig1 is drawn at half, the other figures at a quarter of the image size
+MAIN_LEVEL = 1
+PREVIEW_LEVEL = 2
+# The figures showing derived images are built once the browser has laid out fig1, or after this many milliseconds for
+# clients that never lay out the document
+SECONDARY_TIMEOUT_MS = 3000
 
 
 # This function is used to change images. To avoid code duplicates, this function can also
 # be called at startup to initialize the dashboard. You should construct the image datasources for all figures in this
 # function. Read the assignment 2 slides for tips and implementation suggestions regarding the grayscale image.
 def change_image(new):
-    img, [xdim, ydim] = open_image(new)
+    with recorder.stage("decode"):
+        entry = image_cache.get_image(new)
+    img = entry["image"]
     global img_source, original_img_source, noisy_img_source, red_img_source, green_img_source, blue_img_source, greyscale_img_source, img_size, current_image
 
+    img_size = entry["size"]
+    current_image = new
+
     update_source(original_img_source, img)
     update_source(img_source, img)
     update_source(noisy_img_source, img)
-    update_source(red_img_source, red_channel(img))
-    update_source(green_img_source, green_channel(img))
-    update_source(blue_img_source, blue_channel(img))
-    update_source(greyscale_img_source, greyscale(img))
-
-    img_size = [xdim, ydim]
-    current_image = new
+    update_source(red_img_source, entry["red"])
+    update_source(green_img_source, entry["green"])
+    update_source(blue_img_source, entry["blue"])
+    update_source(greyscale_img_source, entry["greyscale"])
 
 
 # This function must be triggered each time a different image is chosen. It must call the change_image function with the new
@@ -110,12 +87,14 @@ def change_image(new):
 def select_image(attr, old, new):
     change_image(new)
     reset()
+    send_updates("select_image")
 
 
 # This function must be triggered when the reset button is clicked. You can use change_image to reset the images back to the
 # original state by accessing the image select widgets value. Also initiates the necessary reset process.
 def reset_dashboard():
     reset()
+    send_updates("reset")
 
 
 # Helper function for the reset process. Carefully read in the assignment description which values should be reset and
@@ -126,12 +105,16 @@ def reset():
     filter_selector.value = MEDIAN
     current_filter = MEDIAN
     filter_slider.value = 0
-    fig1.title.text = ORIGINAL
+    show_title(ORIGINAL)
     noise_slider.value = 0
 
     global current_image, img_source, noisy_img_source
 
-    img, [xdim, ydim] = open_image(current_image)
+    global noise_state
+
+    cancel_jobs()
+    noise_state = (0, None)
+    img = image_cache.get_image(current_image)["image"]
     update_source(img_source, img)
     update_source(noisy_img_source, img)
 
@@ -150,20 +133,213 @@ def add_noise(attr, old, new):
     global noisy_img_source, img_source, original_img_source, img_size
 
     img = get_image_source(original_img_source)
-    noisy_image = salt_pepper_noise(img, img_size, new)
-    update_source(noisy_img_source, noisy_image)
-    update_source(img_source, noisy_image)
-    fig1.title.text = NOISY
+    size = img_size
+    # the seed identifies the noise, filter results computed from it can be cached
+    seed = int(np.random.default_rng().integers(2**32))
+    # a pending filter job filters the previous noise, its result must not replace the new noise
+    cancel_job("filter")
+    submit_job(
+        "noise",
+        partial(show_noise, (new, seed)),
+        lambda cancelled: build_pyramid(salt_pepper_noise(img, size, new, seed)),
+    )
+
+
+# Show the result of a finished noise job
+def show_noise(state, noisy_pyramid):
+    global noise_state
+
+    noise_state = state
+    update_source(noisy_img_source, noisy_pyramid)
+    update_source(img_source, noisy_pyramid)
+    show_title(NOISY)
+
+
+# Title of fig1 for the image it shows, the title says that it is computing while jobs run
+def show_title(text):
+    global image_title
+
+    image_title = text
+    fig1.title.text = text
+
+
+# Helper function to run the expensive part of a callback in the worker pool. The figure shows that it is computing
+# until the result is applied on a later tick with the document lock held. A job that is superseded by a newer job of
+# the same kind, e.g. because the slider moved again, is cancelled or its result dropped. compute is called with a
+# function telling whether the job was superseded, so a long computation can stop early.
+def submit_job(kind, apply, compute):
+    cancel_job(kind)
+    stop = threading.Event()
+    future = executor.submit(recorder.wrap(kind, compute), stop.is_set)
+    jobs[kind] = future
+    job_stops[kind] = stop
+    fig1.title.text = COMPUTING
+    doc.add_next_tick_callback(partial(wait_for_job, kind, future, apply))
+
+
+# Waits for a job without holding the document lock, so the server keeps handling other callbacks and sessions
+@gen.coroutine
+@without_document_lock
+def wait_for_job(kind, future, apply):
+    try:
+        result = yield future
+    except CancelledError:
+        return
+    except Exception:
+        log.exception("%s job of session %s failed", kind, session_name(doc))
+        doc.add_next_tick_callback(partial(drop_job, kind, future))
+        return
+    doc.add_next_tick_callback(partial(finish_job, kind, future, apply, result))
+
+
+def finish_job(kind, future, apply, result):
+    if jobs.get(kind) is not future:
+        return
+    remove_job(kind)
+    apply(result)
+    send_updates(kind)
+
+
+# Drop a job that failed, fig1 keeps showing its image under its title again once no other job runs
+def drop_job(kind, future):
+    if jobs.get(kind) is not future:
+        return
+    remove_job(kind)
+    if not jobs:
+        fig1.title.text = image_title
+
+
+def cancel_job(kind):
+    if kind in jobs:
+        remove_job(kind).cancel()
 
 
-# Helper function to update the source image of a source
-def update_source(source, new_image_source):
-    source.data["image"] = [new_image_source]
+# Drop all running jobs, e.g. when the dashboard is reset
+def cancel_jobs():
+    for kind in list(jobs):
+        cancel_job(kind)
 
 
-# Helper function to get the image data source to improve readability
+# Remove a job from jobs, a computation that is still running is asked to stop
+def remove_job(kind):
+    job_stops.pop(kind).set()
+    return jobs.pop(kind)
+
+
+# Helper function to update the source image of a source. The full resolution image stays on the server as level 0 of
+# a pyramid, the figures only receive the level matching the size they are drawn at. The update is staged until
+# send_updates is called.
+def update_source(source, pyramid):
+    source_pyramids[source] = pyramid
+
+    if source == img_source:
+        update_zoom_tile()
+    else:
+        stage_update(source, pyramid[PREVIEW_LEVEL])
+
+
+# Helper function to get the full resolution image of a source to improve readability
 def get_image_source(source):
-    return source.data["image"][0]
+    return source_pyramids[source][0]
+
+
+# Stage a new image for a column of the image source, along with other columns describing it. Images the browser
+# already shows are skipped. An image is identified by the array or pyramid it was taken from, cached ones are shared so
+# this is checked by identity, and by the window of it that is shown, if any. RGBA images are packed into 2D uint32
+# arrays, the format bokeh sends as binary buffers without converting it first.
+def stage_update(name, image, origin=None, window=None, **columns):
+    shown = (image if origin is None else origin, window)
+    sent = sent_images.get(name)
+    if sent is not None and sent[0] is shown[0] and sent[1] == shown[1]:
+        for key in [name] + list(columns):
+            pending_updates.pop(key, None)
+        staged_images.pop(name, None)
+        return
+    staged_images[name] = shown
+    if image.ndim == 3:
+        image = pack_rgba(image)
+    pending_updates[name] = [image]
+    for key, value in columns.items():
+        pending_updates[key] = [value]
+
+
+# Send the staged columns with a single change of the image source. All image changes of one user action therefore
+# reach the browser as one patch, which only carries the columns that changed. Only the given columns are sent if
+# columns is not None, the others stay staged. The bytes of image data sent are counted per action in transport_stats.
+def send_updates(action, columns=None):
+    updates = {
+        name: value
+        for name, value in pending_updates.items()
+        if columns is None or name in columns
+    }
+    if not updates:
+        return
+    nbytes = sum(
+        value[0].nbytes
+        for value in updates.values()
+        if isinstance(value[0], np.ndarray)
+    )
+    with recorder.stage("send " + action):
+        image_source.data.update(updates)
+    for name in updates:
+        del pending_updates[name]
+        if name in staged_images:
+            sent_images[name] = staged_images.pop(name)
+
+    updates, total = transport_stats.get(action, (0, 0))
+    transport_stats[action] = (updates + 1, total + nbytes)
+
+
+# fig1 shows the half resolution level. When the user zooms in, only the visible part of the image is sent, taken from
+# the pyramid level that still has at least as many pixels as fig1 shows on screen.
+def update_zoom_tile():
+    pyramid = source_pyramids[img_source]
+    window = tile_window(pyramid)
+    level, left, right, bottom, top = window
+    tile = pyramid[level]
+    height, width = tile.shape[:2]
+    stage_update(
+        img_source,
+        tile[bottom:top, left:right],
+        origin=pyramid,
+        window=window,
+        x=left / width * img_args["dw"],
+        y=bottom / height * img_args["dh"],
+        dw=(right - left) / width * img_args["dw"],
+        dh=(top - bottom) / height * img_args["dh"],
+    )
+
+
+# Pyramid level and visible window (left, right, bottom, top) in pixels of that level of the tile fig1 shows. In display
+# coordinates the image spans img_args dw and dh.
+def tile_window(pyramid):
+    x_start, x_end, y_start, y_end = zoom_window
+
+    zoom = 1 / max(x_end - x_start, y_end - y_start)
+    level = max(MAIN_LEVEL - int(np.log2(zoom)), 0)
+    height, width = pyramid[level].shape[:2]
+    left, right = int(x_start * width), int(np.ceil(x_end * width))
+    bottom, top = int(y_start * height), int(np.ceil(y_end * height))
+    return level, left, right, bottom, top
+
+
+# Triggered once the user has finished panning or zooming fig1, and when its view is reset. The browser has synced the
+# ranges by then. Stores the visible part of the image as fractions of the displayed image and sends a new tile for it,
+# nothing is sent when fig1 already shows that tile.
+def change_zoom(event):
+    global zoom_window
+
+    window = [
+        min(max(fig1.x_range.start / img_args["dw"], 0), 1),
+        min(max(fig1.x_range.end / img_args["dw"], 0), 1),
+        min(max(fig1.y_range.start / img_args["dh"], 0), 1),
+        min(max(fig1.y_range.end / img_args["dh"], 0), 1),
+    ]
+    if window[0] >= window[1] or window[2] >= window[3]:
+        return
+    zoom_window = window
+    update_zoom_tile()
+    send_updates("zoom")
 
 
 # This function must be triggered when the filter button is pressed. You can use the scipy Gauss and median filter that
@@ -171,24 +347,38 @@ def get_image_source(source):
 def filter_noise():
     global img_source, original_img_source, current_filter, filter_slider
 
-    img = get_image_source(img_source)
-
     if filter_slider.value == 0:
         print("Filter not applied, filter value = 0")
         return
 
-    if current_filter == GAUSS:
-        filtered_image = gaussian_filter(
-            input=img, sigma=(filter_slider.value, filter_slider.value, 0)
-        )
-    else:
-        filtered_image = median_filter(
-            input=img, size=(filter_slider.value, filter_slider.value, 1)
-        )
+    # The filter is always applied to the noisy image, pressing the button again does not filter the filtered image.
+    # Results are reused across sessions when the same image, noise and filter settings come up again.
+    filter_type = current_filter
+    value = filter_slider.value
+    key = (image_cache.key(current_image), noise_state, filter_type, value)
+    filtered_pyramid = filter_cache.get(key)
+    if filtered_pyramid is not None:
+        cancel_job("filter")
+        show_filtered(key, filtered_pyramid)
+        send_updates("filter")
+        return
+
+    img = get_image_source(noisy_img_source)
+    submit_job(
+        "filter",
+        partial(show_filtered, key),
+        lambda cancelled: build_pyramid(
+            filter_image(img, filter_type, value, cancelled=cancelled)
+        ),
+    )
 
-    update_source(img_source, filtered_image)
 
-    fig1.title.text = FILTERED
+# Show the result of a filter, results that were just computed are added to the cache
+def show_filtered(key, filtered_pyramid):
+    if key not in filter_cache:
+        filter_cache.put(key, filtered_pyramid, pyramid_nbytes(filtered_pyramid))
+    update_source(img_source, filtered_pyramid)
+    show_title(FILTERED)
 
 
 # This function must be triggered when the a different filter is selected in the filter select widget. Use this to
@@ -212,7 +402,7 @@ def change_filter_slider(attr, old, new):
         filter_slider.end = 50
         filter_slider.step = 1
         filter_slider.title = "Mask Size (Pixel)"
-        current_filter = MEDIAN
+        current_filter = new
 
 
 ###############################
@@ -222,18 +412,49 @@ def change_filter_slider(attr, old, new):
 # Helper variables to make code more readable
 current_image = ""
 current_filter = MEDIAN
-
-# The first source is given, setup the rest of them.
-img_source = ColumnDataSource(data={"image": [0]})
+# Document of this session, its running background jobs by kind and the events asking them to stop
+doc = curdoc()
+jobs = {}
+job_stops = {}
+# Time, memory and bytes sent per stage, only recorded when instrumentation is switched on
+recorder = Recorder(session_name(doc))
+recorder.watch(doc)
+# Percentage and seed of the noise currently applied to the image, title of the image fig1 shows
+noise_state = (0, None)
+image_title = ORIGINAL
+# Seconds from the start of the session until the browser painted fig1
+first_paint_seconds = None
+
+# All images are columns of one source, the sources of the figures are the names of their columns. fig1 also reads
+# the position of its image from the source.
+img_source = "image"
 img_size = [0, 0]
+# Full resolution pyramids of the sources, visible part of fig1 (x start, x end, y start, y end as fractions of the
+# image) and its size in display coordinates until the figures are set up
+source_pyramids = {}
+zoom_window = [0, 1, 0, 1]
+img_args = {"dw": 1, "dh": 1}
 
 # Rest of them
-original_img_source = ColumnDataSource(data={"image": [0]})
-blue_img_source = ColumnDataSource(data={"image": [0]})
-red_img_source = ColumnDataSource(data={"image": [0]})
-green_img_source = ColumnDataSource(data={"image": [0]})
-greyscale_img_source = ColumnDataSource(data={"image": [0]})
-noisy_img_source = ColumnDataSource(data={"image": [0]})
+original_img_source = "original"
+blue_img_source = "blue"
+red_img_source = "red"
+green_img_source = "green"
+greyscale_img_source = "greyscale"
+noisy_img_source = "noisy"
+
+# Columns of fig1, the only ones in the document sent for the first paint
+main_columns = [img_source, "x", "y", "dw", "dh"]
+image_columns = main_columns + [original_img_source]
+image_columns += [blue_img_source, red_img_source, green_img_source]
+image_columns += [greyscale_img_source, noisy_img_source]
+image_source = ColumnDataSource(data={column: [0] for column in image_columns})
+# Columns waiting to be sent, the origin and window of the images staged and sent per column and (number of updates,
+# bytes) sent per action
+pending_updates = {}
+staged_images = {}
+sent_images = {}
+transport_stats = {}
 
 
 change_image("image_1")
@@ -255,7 +476,12 @@ img_args = {"x": 0, "y": 0, "dw": img_size[0], "dh": img_size[1]}
 fig1 = figure(
     title=ORIGINAL, width=int(img_size[0] / 2), height=int(img_size[1] / 2), **fig_args
 )
-fig1.image_rgba(image="image", source=img_source, **img_args)
+fig1.image_rgba(image=img_source, x="x", y="y", dw="dw", dh="dh", source=image_source)
+zoom_callback = recorder.wrap("change_zoom", change_zoom)
+fig1.on_event(LODEnd, zoom_callback)
+fig1.on_event(Reset, zoom_callback)
+update_zoom_tile()
+send_updates("startup", main_columns)
 
 # Depending on how you choose to implement the linking and tool behavior of the rest of the figures you might need a
 # second set of figure arguments
@@ -266,48 +492,103 @@ fig_args2 = {
 }
 
 
-# Implement the rest of the figures in the following part
-fig2 = figure(
-    title=NOISY, width=int(img_size[0] / 4), height=int(img_size[1] / 4), **fig_args2
-)
-fig2.image_rgba(image="image", source=noisy_img_source, **img_args)
+# Implement the rest of the figures in the following part. They only show derived images, so they are built once the
+# browser has painted fig1 and the widgets, and their images are sent then.
+fig2 = fig3 = fig4 = fig5 = fig6 = fig7 = None
 
-fig3 = figure(
-    title=ORIGINAL, width=int(img_size[0] / 4), height=int(img_size[1] / 4), **fig_args2
-)
-fig3.image_rgba(image="image", source=original_img_source, **img_args)
 
-fig4 = figure(
-    title=RED_CHANNEL,
-    width=int(img_size[0] / 4),
-    height=int(img_size[1] / 4),
-    **fig_args2
-)
-fig4.image_rgba(image="image", source=red_img_source, **img_args)
+def build_secondary_figures():
+    global fig2, fig3, fig4, fig5, fig6, fig7
 
-fig5 = figure(
-    title=GREEN_CHANNEL,
-    width=int(img_size[0] / 4),
-    height=int(img_size[1] / 4),
-    **fig_args2
-)
-fig5.image_rgba(image="image", source=green_img_source, **img_args)
+    if fig2 is not None:
+        return
+    fig2 = figure(
+        title=NOISY,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig2.image_rgba(image=noisy_img_source, source=image_source, **img_args)
 
-fig6 = figure(
-    title=BLUE_CHANNEL,
-    width=int(img_size[0] / 4),
-    height=int(img_size[1] / 4),
-    **fig_args2
-)
-fig6.image_rgba(image="image", source=blue_img_source, **img_args)
+    fig3 = figure(
+        title=ORIGINAL,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig3.image_rgba(image=original_img_source, source=image_source, **img_args)
+
+    fig4 = figure(
+        title=RED_CHANNEL,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig4.image(
+        image=red_img_source,
+        source=image_source,
+        color_mapper=LinearColorMapper(palette=channel_palette(RED), low=0, high=255),
+        **img_args
+    )
+
+    fig5 = figure(
+        title=GREEN_CHANNEL,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig5.image(
+        image=green_img_source,
+        source=image_source,
+        color_mapper=LinearColorMapper(palette=channel_palette(GREEN), low=0, high=255),
+        **img_args
+    )
+
+    fig6 = figure(
+        title=BLUE_CHANNEL,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig6.image(
+        image=blue_img_source,
+        source=image_source,
+        color_mapper=LinearColorMapper(palette=channel_palette(BLUE), low=0, high=255),
+        **img_args
+    )
+
+    fig7 = figure(
+        title=GREYSCALE,
+        width=int(img_size[0] / 4),
+        height=int(img_size[1] / 4),
+        **fig_args2
+    )
+    fig7.image_rgba(image=greyscale_img_source, source=image_source, **img_args)
+
+    reset_callback.args = dict(p=[fig1, fig2, fig3, fig4, fig5, fig6, fig7])
+    layout.children[0].children.insert(1, column(fig2, fig3))
+    layout.children.insert(1, row(fig4, fig5, fig6, fig7))
+    send_updates("secondary")
+    # the other images are decoded after the first paint, so they do not compete with it
+    image_cache.prefetch(image_selector.options)
+
+
+# Triggered when the browser reports the size of fig1 after laying it out, i.e. when the first paint is done. The time
+# since the start of the session is logged once.
+def first_paint(attr, old, new):
+    global first_paint_seconds
+
+    if first_paint_seconds is None:
+        first_paint_seconds = time.perf_counter() - session_start
+        log.info(
+            "Session %s: first paint after %.0f ms",
+            session_name(doc),
+            first_paint_seconds * 1e3,
+        )
+        if recorder.enabled:
+            recorder.add("first paint", first_paint_seconds, 0, 0)
+    build_secondary_figures()
 
-fig7 = figure(
-    title=GREYSCALE,
-    width=int(img_size[0] / 4),
-    height=int(img_size[1] / 4),
-    **fig_args2
-)
-fig7.image_rgba(image="image", source=greyscale_img_source, **img_args)
 
 # Implement the widgets needed for the interaction with the plots. The reset button is already provided as an example.
 # As you can see, the on_click method of the button is used to connect the reset_dashboard function with the clicking
@@ -317,16 +598,15 @@ fig7.image_rgba(image="image", source=greyscale_img_source, **img_args)
 # the reset signal on all plots (same as clicking reset on the toolbar), which resets the zoom and pan of the image.
 
 reset_button = Button(label="Reset", width=int(img_size[0] / 8))
-reset_button.on_click(reset_dashboard)
-reset_button.js_on_click(
-    CustomJS(
-        args=dict(p=[fig1, fig2, fig3, fig4, fig5, fig6, fig7]),
-        code="""
+reset_button.on_click(recorder.wrap("reset", reset_dashboard))
+reset_callback = CustomJS(
+    args=dict(p=[fig1]),
+    code="""
     for (var i = 0; i < p.length; i++){
         p[i].reset.emit()
     }""",
-    )
 )
+reset_button.js_on_click(reset_callback)
 
 
 image_selector = Select(
@@ -334,21 +614,25 @@ image_selector = Select(
     value="image_1",
     title="Image",
 )
-image_selector.on_change("value", select_image)
+image_selector.on_change("value", recorder.wrap("select_image", select_image))
 
 
 noise_slider = Slider(start=0, end=50, value=0, step=1, title="Noise (%)")
 noise_slider.callback_policy = "mouseup"
-noise_slider.on_change("value_throttled", add_noise)
+noise_slider.on_change("value_throttled", recorder.wrap("add_noise", add_noise))
 
 filter_slider = Slider(start=3, end=50, value=0, step=1, title="Mask Size (Pixel)")
 
-filter_selector = Select(options=[MEDIAN, GAUSS], value=MEDIAN, title="Filter Type",)
+filter_selector = Select(
+    options=[MEDIAN, FAST_MEDIAN, GAUSS],
+    value=MEDIAN,
+    title="Filter Type",
+)
 filter_selector.on_change("value", change_filter_slider)
 
 
 filter_button = Button(label="Filter", width=int(img_size[0] / 8))
-filter_button.on_click(filter_noise)
+filter_button.on_click(recorder.wrap("filter_noise", filter_noise))
 # Use the curdoc function to construct a layout of your dashboard. The column and row functions might also come in
 # handy to layout your plots.
 
@@ -360,6 +644,13 @@ menu = column(
     filter_button,
     reset_button,
 )
-layout = column(row(fig1, column(fig2, fig3), menu), row(fig4, fig5, fig6, fig7))
+layout = column(row(fig1, menu))
+if recorder.enabled:
+    layout.children.append(recorder.table(doc))
 curdoc().add_root(layout)
 curdoc().title = "dva_ex2"
+if doc.session_context is None:
+    build_secondary_figures()
+else:
+    fig1.on_change("inner_width", first_paint)
+    doc.add_timeout_callback(build_secondary_figures, SECONDARY_TIMEOUT_MS)
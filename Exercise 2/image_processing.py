@@ -0,0 +1,491 @@
+import numpy as np
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+# Constants
+MEDIAN = "Median"
+FAST_MEDIAN = "Median (fast)"
+GAUSS = "Gauss"
+GREYSCALE_WEIGHTS = {"red": 0.3, "green": 0.59, "blue": 0.11}
+# The weights have two decimals, scaled by 100 they are exact integers and 255 * 100 still fits into uint16
+GREYSCALE_SCALE = 100
+GREYSCALE_FIXED_WEIGHTS = [
+    round(GREYSCALE_WEIGHTS[colour] * GREYSCALE_SCALE)
+    for colour in ("red", "green", "blue")
+]
+BLACK = [0, 0, 0, 255]
+WHITE = [255, 255, 255, 255]
+RED = 0
+GREEN = 1
+BLUE = 2
+# Number of half resolution levels built on top of an image
+PYRAMID_LEVELS = 2
+# Default memory budget of the decoded image cache
+IMAGE_CACHE_BYTES = 512 * 1024**2
+# Default memory budget of the filter result cache
+FILTER_CACHE_BYTES = 256 * 1024**2
+# Number of threads computing noise and filters in the background. numpy and scipy.ndimage release the GIL, a few more
+# threads than cores keep short jobs from queueing behind a long filter.
+WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Number of threads filtering the tiles of one image
+TILE_WORKERS = os.cpu_count() or 1
+# Strips per tile worker of a filter that can be cancelled. A cancelled filter stops after the strips it is working on,
+# smaller strips free the tile threads sooner but filter more halo rows.
+CANCEL_STRIPS = 4
+# Gauss kernels are cut off at this many sigmas, the default of scipy.ndimage
+GAUSS_TRUNCATE = 4.0
+# Smallest mask size at which "Median (fast)" counts thresholds, below it scipy's median_filter is faster (measured on
+# 960x540 uint8 channels: break-even between 9 and 11)
+FAST_MEDIAN_MIN_SIZE = 11
+# Directory next to the images holding their decoded pixels
+PIXEL_STORE_DIRECTORY = ".pixel_store"
+
+
+# open and convert image to a usable format. PIL and scipy.ndimage are imported where they are used, so starting the
+# dashboard or the batch workers does not wait for modules a session may never need.
+def open_image(name, extension=".jpg"):
+    from PIL import Image
+
+    image = Image.open(os.path.abspath(name + extension)).convert("RGBA")
+    xdim, ydim = image.size
+    orig = np.flipud(np.array(image))
+    return orig, [xdim, ydim]
+
+
+# Path of the decoded pixels of an image file in the pixel store
+def pixel_store_path(path):
+    directory, file = os.path.split(path)
+    return os.path.join(directory, PIXEL_STORE_DIRECTORY, file + ".npy")
+
+
+# Same result as open_image, but the pixels are decoded only once into a .npy file of the pixel store and memory mapped
+# read only from there. Every session and every server process shares the pages of the mapped file instead of holding
+# its own decoded copy; noise and filters copy the pixels when they change them. The stored file gets the modification
+# time of the image, an image that is added or replaced is decoded again on its next use. The store is only an
+# optimization: when it cannot be written or read, e.g. in a read only directory or on a full disk, the decoded pixels
+# are returned like open_image does.
+def load_image(name, extension=".jpg"):
+    path = os.path.abspath(name + extension)
+    stored = pixel_store_path(path)
+    mtime = os.stat(path).st_mtime_ns
+    prune_pixel_store(os.path.dirname(path))
+    if not os.path.exists(stored) or os.stat(stored).st_mtime_ns != mtime:
+        img, img_size = open_image(name, extension)
+        try:
+            store_pixels(img, stored, mtime)
+        except OSError:
+            return img, img_size
+
+    try:
+        img = np.asarray(np.load(stored, mmap_mode="r"))
+    except OSError:
+        return open_image(name, extension)
+    return img, [img.shape[1], img.shape[0]]
+
+
+# Write decoded pixels to the pixel store with the modification time of their image. The file is written under a
+# temporary name and renamed, so concurrent processes never map a partially written file.
+def store_pixels(img, stored, mtime):
+    os.makedirs(os.path.dirname(stored), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(stored), prefix=os.path.basename(stored), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, img)
+        os.utime(temporary, ns=(mtime, mtime))
+        os.replace(temporary, stored)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+# Remove the stored pixels of images that no longer exist in a directory. Other processes can prune the same store at
+# the same time, files they removed first are skipped.
+def prune_pixel_store(directory):
+    store = os.path.join(directory, PIXEL_STORE_DIRECTORY)
+    if not os.path.isdir(store):
+        return
+    for file in os.listdir(store):
+        image, extension = os.path.splitext(file)
+        if extension == ".npy" and not os.path.exists(os.path.join(directory, image)):
+            try:
+                os.remove(os.path.join(store, file))
+            except OSError:
+                pass
+
+
+# Extract Red Channel from the image (set other channels to 0)
+def red_channel(img):
+    return channel_rgba(img, RED)
+
+
+# Extract Green Channel from the image (set other channels to 0)
+def green_channel(img):
+    return channel_rgba(img, GREEN)
+
+
+# Extract Blue Channel from the image (set other channels to 0)
+def blue_channel(img):
+    return channel_rgba(img, BLUE)
+
+
+# Build an RGBA image that only keeps one colour channel. The output starts as zeroed memory and only the kept channel
+# and alpha are written, instead of copying the whole image and clearing the other channels afterwards.
+def channel_rgba(img, channel):
+    image = np.zeros(img.shape, dtype=np.uint8)
+    image[:, :, channel] = img[:, :, channel]
+    image[:, :, 3] = img[:, :, 3]
+    return image
+
+
+# Single colour channel of the image as a 2D view, no pixels are copied. Draw it with an image glyph and the matching
+# channel_palette, so only a quarter of the RGBA bytes are sent to the browser.
+def channel_view(img, channel):
+    return img[:, :, channel]
+
+
+# 256 colour palette going from black to the full intensity of a colour channel
+def channel_palette(channel):
+    colour = [0, 0, 0]
+    palette = []
+    for value in range(256):
+        colour[channel] = value
+        palette.append("#{:02x}{:02x}{:02x}".format(*colour))
+    return palette
+
+
+# Compute greyscale version by multiplying the different channels and merge them together. The luminance is computed
+# once in integer fixed point (the weights scaled by GREYSCALE_SCALE) with small uint16 temporaries, then floored and
+# broadcast into the colour channels. The result can be written into a caller supplied uint8 array of the image shape.
+def greyscale(img, out=None):
+    if out is None:
+        out = np.empty(img.shape, dtype=np.uint8)
+
+    luminance = np.multiply(img[:, :, 0], GREYSCALE_FIXED_WEIGHTS[0], dtype=np.uint16)
+    channel = np.empty_like(luminance)
+    for index in (1, 2):
+        np.multiply(
+            img[:, :, index],
+            GREYSCALE_FIXED_WEIGHTS[index],
+            out=channel,
+            dtype=np.uint16,
+        )
+        luminance += channel
+    luminance //= GREYSCALE_SCALE
+
+    out[:, :, :3] = luminance[:, :, np.newaxis]
+    out[:, :, 3] = 255
+
+    return out
+
+
+# Add noise to an image. All noisy pixel coordinates and their colour are drawn at once and written through a flat
+# view of the image, so the cost no longer grows with an interpreter loop per pixel. Passing a seed makes the noise
+# reproducible.
+def salt_pepper_noise(img, img_size, percentage, seed=None):
+    image = np.copy(img, order="C")
+    rng = np.random.default_rng(seed)
+
+    nr_of_pixels = img_size[0] * img_size[1]
+    nr_of_noisy_pixels = int(nr_of_pixels / 100 * percentage)
+    coordinates = rng.integers(0, nr_of_pixels, nr_of_noisy_pixels)
+    black_or_white = rng.integers(0, 2, nr_of_noisy_pixels, dtype=bool)
+
+    pixels = image.reshape(-1, image.shape[-1])
+    pixels[coordinates[black_or_white]] = BLACK
+    pixels[coordinates[~black_or_white]] = WHITE
+
+    return image
+
+
+# Filter an image with the median filter (value is the mask size) or the Gauss filter (value is sigma). The colour
+# channels are not mixed. The image is split into horizontal strips that are filtered in parallel, each strip is
+# extended by a halo of the rows the filter reaches into so the result is the same as filtering the whole image at
+# once. A constant alpha channel stays constant (up to the rounding of the Gauss filter), so only a single pixel of it
+# is filtered. When cancelled is given, it is called before each strip and the image is split into CANCEL_STRIPS strips
+# per worker. Once it returns True the remaining strips are skipped and CancelledError is raised.
+def filter_image(img, filter_type, value, workers=TILE_WORKERS, cancelled=None):
+    filtered_image = np.empty(img.shape, dtype=img.dtype)
+    channels = img.shape[2]
+    alpha = img[:, :, 3]
+    if np.all(alpha == alpha[0, 0]):
+        channels = 3
+        pixel = filter_channels(img[:1, :1], filter_type, value)
+        filtered_image[:, :, 3] = pixel[0, 0, 3]
+
+    height = img.shape[0]
+    halo = filter_halo(filter_type, value)
+    strips = workers if cancelled is None else workers * CANCEL_STRIPS
+    strip_height = -(-height // strips)
+
+    def filter_strip(start):
+        if cancelled is not None and cancelled():
+            return
+        stop = min(start + strip_height, height)
+        top, bottom = max(start - halo, 0), min(stop + halo, height)
+        strip = filter_channels(img[top:bottom, :, :channels], filter_type, value)
+        filtered_image[start:stop, :, :channels] = strip[start - top : stop - top]
+
+    starts = range(0, height, strip_height)
+    if workers == 1:
+        for start in starts:
+            filter_strip(start)
+    else:
+        list(tile_executor.map(filter_strip, starts))
+
+    if cancelled is not None and cancelled():
+        raise CancelledError()
+    return filtered_image
+
+
+def filter_channels(img, filter_type, value):
+    from scipy.ndimage import gaussian_filter, median_filter
+
+    if filter_type == GAUSS:
+        return gaussian_filter(
+            input=img, sigma=(value, value, 0), truncate=GAUSS_TRUNCATE
+        )
+    if filter_type == FAST_MEDIAN and int(value) >= FAST_MEDIAN_MIN_SIZE:
+        return fast_median_filter(img, int(value))
+    return median_filter(input=img, size=(value, value, 1))
+
+
+# Median filter for uint8 images whose cost does not depend on the mask size. For every grey level t the number of
+# pixels <= t inside each mask is read from a summed-area table of the image thresholded at t; the median of a mask is
+# the number of levels at which fewer than half of its pixels are reached. The tables are kept in uint16, the window
+# sums are correct modulo 2**16 and a mask holds at most 50 * 50 pixels. Borders are reflected like scipy.ndimage does,
+# so the result is identical to median_filter.
+def fast_median_filter(img, size):
+    filtered_image = np.empty(img.shape, dtype=np.uint8)
+    for channel in range(img.shape[2]):
+        filtered_image[:, :, channel] = fast_median_channel(img[:, :, channel], size)
+    return filtered_image
+
+
+def fast_median_channel(channel, size):
+    before = size // 2
+    after = size - 1 - before
+    padded = np.pad(channel, ((before, after), (before, after)), mode="symmetric")
+    rank = size * size // 2
+
+    low, high = int(channel.min()), int(channel.max())
+    median = np.full(channel.shape, low, dtype=np.uint8)
+    table = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.uint16)
+    counts = np.empty(channel.shape, dtype=np.uint16)
+    for threshold in range(low, high):
+        np.cumsum(padded <= threshold, axis=0, dtype=np.uint16, out=table[1:, 1:])
+        np.cumsum(table[1:, 1:], axis=1, dtype=np.uint16, out=table[1:, 1:])
+        np.subtract(table[size:, size:], table[:-size, size:], out=counts)
+        counts -= table[size:, :-size]
+        counts += table[:-size, :-size]
+        median += counts <= rank
+
+    return median
+
+
+# Number of neighbouring rows on each side a filter reads to compute one row
+def filter_halo(filter_type, value):
+    if filter_type == GAUSS:
+        return int(GAUSS_TRUNCATE * value + 0.5)
+    return int(value) // 2
+
+
+# View an RGBA image as a 2D array of packed uint32 pixels, only non contiguous images are copied
+def pack_rgba(img):
+    return np.ascontiguousarray(img).view(np.uint32).reshape(img.shape[:2])
+
+
+# Halve the resolution of an image by averaging blocks of 2x2 pixels. Works for RGBA images as well as single channels,
+# an odd last row or column is dropped.
+def downsample(img):
+    height = img.shape[0] // 2 * 2
+    width = img.shape[1] // 2 * 2
+    blocks = img[:height, :width]
+
+    total = blocks[0::2, 0::2].astype(np.uint16)
+    total += blocks[1::2, 0::2]
+    total += blocks[0::2, 1::2]
+    total += blocks[1::2, 1::2]
+    total += 2
+    total >>= 2
+
+    return total.astype(np.uint8)
+
+
+# Multi-resolution pyramid of an image, level n has 1 / 2**n of the resolution of the image in each direction
+def build_pyramid(img, levels=PYRAMID_LEVELS):
+    pyramid = [img]
+    for level in range(levels):
+        pyramid.append(downsample(pyramid[-1]))
+    return pyramid
+
+
+def pyramid_nbytes(pyramid):
+    return sum(level.nbytes for level in pyramid)
+
+
+# Least recently used cache whose size is bounded by the total number of bytes of its values instead of the number of
+# entries. Hits and misses are counted so the effectiveness of the cache can be checked at runtime.
+class LRUCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries.keys())
+
+    # Return the cached value and mark it as most recently used
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    # Store a value, evicting the least recently used entries until it fits. Values larger than the whole budget are
+    # not stored at all.
+    def put(self, key, value, nbytes):
+        self.pop(key)
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        self._evict()
+
+    def pop(self, key):
+        if key not in self._entries:
+            return None
+        value, nbytes = self._entries.pop(key)
+        self.nbytes -= nbytes
+        return value
+
+    # Change the memory budget, evicting entries if the cache no longer fits
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            key, (value, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+
+
+# Load the pixels of an image from the pixel store and derive all views the dashboard shows. Every view is stored as a
+# pyramid so figures can pick the resolution they are drawn at. The arrays are marked read only because they are
+# shared by every caller of the cache.
+def image_entry(name):
+    img, img_size = load_image(name)
+    entry = {
+        "size": img_size,
+        "image": build_pyramid(img),
+        "red": build_pyramid(channel_view(img, RED)),
+        "green": build_pyramid(channel_view(img, GREEN)),
+        "blue": build_pyramid(channel_view(img, BLUE)),
+        "greyscale": build_pyramid(greyscale(img)),
+    }
+    for value in entry_arrays(entry):
+        value.flags.writeable = False
+    return entry
+
+
+# All arrays of a cache entry
+def entry_arrays(entry):
+    arrays = []
+    for value in entry.values():
+        if isinstance(value, list):
+            arrays.extend(item for item in value if isinstance(item, np.ndarray))
+    return arrays
+
+
+# Total size in bytes of the arrays of a cache entry. Views are counted once through the array owning their memory.
+def entry_nbytes(entry):
+    buffers = {}
+    for value in entry_arrays(entry):
+        while isinstance(value.base, np.ndarray):
+            value = value.base
+        buffers[id(value)] = value.nbytes
+    return sum(buffers.values())
+
+
+# Cache of decoded images and their derived views keyed by image name and modification time of the file, so a changed
+# file is decoded again and its stale entry dropped. Images can be requested from sessions and prefetched by worker
+# threads at the same time: an image being decoded is not decoded again, later requests wait for the first one.
+class ImageCache(LRUCache):
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes)
+        self._lock = threading.Lock()
+        self._decoding = {}
+
+    def get_image(self, name):
+        key = self.key(name)
+        with self._lock:
+            entry = self.get(key)
+            if entry is not None:
+                return entry
+            decoding = self._decoding.get(key)
+            if decoding is None:
+                decoding = self._decoding[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return decoding.result()
+
+        try:
+            entry = image_entry(name)
+        except BaseException as error:
+            with self._lock:
+                del self._decoding[key]
+            decoding.set_exception(error)
+            raise
+        with self._lock:
+            del self._decoding[key]
+            self.invalidate(name)
+            self.put(key, entry, entry_nbytes(entry))
+        decoding.set_result(entry)
+        return entry
+
+    # Decode images in the background, so sessions switching to them find them in the cache
+    def prefetch(self, names):
+        for name in names:
+            if self.key(name) not in self and self.key(name) not in self._decoding:
+                executor.submit(self.get_image, name)
+
+    # Identifies the current version of an image, also usable to key results derived from it
+    def key(self, name):
+        return (name, os.path.getmtime(os.path.abspath(name + ".jpg")))
+
+    # Drop every cached version of an image
+    def invalidate(self, name):
+        for key in self.keys():
+            if key[0] == name:
+                self.pop(key)
+
+
+# Shared by all sessions of the dashboard served by the same process
+image_cache = ImageCache(IMAGE_CACHE_BYTES)
+# Filtered pyramids keyed by image version, noise state, filter type and filter value
+filter_cache = LRUCache(FILTER_CACHE_BYTES)
+
+# Worker pool shared by all sessions of the dashboard served by the same process
+executor = ThreadPoolExecutor(max_workers=WORKERS)
+# Separate pool for the tiles so a job never waits for threads of the pool it is running in
+tile_executor = ThreadPoolExecutor(max_workers=TILE_WORKERS)
@@ -0,0 +1,58 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from common import EXERCISE_1, best_of
+from births import CACHE_DIRECTORY, DATASET, cache_key, load_births
+from bench_ingest import write_dataset
+
+ROWS = [10**5, 10**6, 10**7]
+
+
+# Load the cleaned table once without cache files and once with them
+def cold_and_warm(path):
+    shutil.rmtree(
+        os.path.join(os.path.dirname(path), CACHE_DIRECTORY), ignore_errors=True
+    )
+    start = time.perf_counter()
+    cold = load_births(path)
+    cold_time = time.perf_counter() - start
+    warm_time = best_of(lambda: load_births(path))
+    assert load_births(path).equals(cold)
+    return cold_time, warm_time, best_of(lambda: cache_key(path))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-rows", type=int, default=ROWS[-1])
+    args = parser.parse_args()
+
+    print(
+        "{:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "rows", "cold [s]", "warm [s]", "hash [s]", "speedup"
+        )
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        # the bundled dataset, copied so its cache does not change
+        path = os.path.join(directory, DATASET)
+        shutil.copy(os.path.join(EXERCISE_1, DATASET), path)
+        datasets = [("dataset", path)]
+        for rows in ROWS:
+            if rows <= args.max_rows:
+                datasets.append((rows, os.path.join(directory, "{}.csv".format(rows))))
+
+        for rows, path in datasets:
+            if not os.path.exists(path):
+                write_dataset(path, rows)
+            cold, warm, hashing = cold_and_warm(path)
+            print(
+                "{:>10} {:>10.3f} {:>10.3f} {:>10.3f} {:>9.1f}x".format(
+                    rows, cold, warm, hashing, cold / warm
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from common import IMAGES, best_of, image_path, peak_memory
+from image_processing import BLUE, GREEN, RED, channel_view, image_entry, open_image
+from image_processing import blue_channel, green_channel, red_channel
+
+
+# The original channel extraction, kept as the reference for the comparison
+def channels_copy(img):
+    channels = []
+    for keep in (RED, GREEN, BLUE):
+        image = np.copy(img)
+        for channel in (RED, GREEN, BLUE):
+            if channel != keep:
+                image[:, :, channel] *= 0
+        channels.append(image)
+    return channels
+
+
+def channels_rgba(img):
+    return [red_channel(img), green_channel(img), blue_channel(img)]
+
+
+def channels_view(img):
+    return [channel_view(img, channel) for channel in (RED, GREEN, BLUE)]
+
+
+def main():
+    print(
+        "{:<8} {:<6} {:>10} {:>10} {:>12} {:>12}".format(
+            "image", "method", "time [ms]", "peak [MB]", "payload [MB]", "entry [ms]"
+        )
+    )
+    for name in IMAGES:
+        img, img_size = open_image(image_path(name))
+        # decode plus all derived views, i.e. the work before the first render of an image
+        entry_time = best_of(lambda: image_entry(image_path(name)))
+        for method, func in [
+            ("copy", channels_copy),
+            ("rgba", channels_rgba),
+            ("view", channels_view),
+        ]:
+            time = best_of(lambda: func(img))
+            memory = peak_memory(lambda: func(img))
+            payload = sum(channel.nbytes for channel in func(img))
+            print(
+                "{:<8} {:<6} {:>10.2f} {:>10.1f} {:>12.1f} {:>12.2f}".format(
+                    name,
+                    method,
+                    time * 1e3,
+                    memory / 1e6,
+                    payload / 1e6,
+                    entry_time * 1e3,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
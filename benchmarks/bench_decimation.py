@@ -0,0 +1,78 @@
+import os
+import time
+
+import numpy as np
+from bokeh.embed import file_html
+from bokeh.models import ColumnDataSource
+from bokeh.plotting import figure
+from bokeh.resources import CDN
+
+from common import EXERCISE_1, best_of
+from decimation import LTTB, MIN_MAX, decimate
+
+POINTS = [10**4, 10**5, 10**6]
+PLOT_WIDTH = 1500
+
+
+# A per-day registration series over the years of the dataset
+def daily_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(1998, 2016, n)
+    y = 400 + 200 * np.sin(x - 1998) + rng.normal(0, 30, n)
+    return {"x": x, "y": y}
+
+
+# HTML of a figure drawing the series as a line
+def line_html(data):
+    plot = figure(plot_width=PLOT_WIDTH, plot_height=500)
+    plot.line(x="x", y="y", source=ColumnDataSource(data))
+    return file_html(plot, CDN)
+
+
+# Build the dashboard of the exercise without showing it
+def dashboard_html():
+    os.chdir(EXERCISE_1)
+    namespace = {"__file__": os.path.join(EXERCISE_1, "dva_hs19_ex1.py")}
+    with open("dva_hs19_ex1.py") as f:
+        exec(f.read().replace("show(dashboard)", "pass"), namespace)
+    return file_html(namespace["dashboard"], CDN)
+
+
+def main():
+    print(
+        "{:>8} {:<8} {:>8} {:>14} {:>10} {:>10}".format(
+            "points", "method", "kept", "decimate [ms]", "html [ms]", "html [MB]"
+        )
+    )
+    for n in POINTS:
+        data = daily_series(n)
+        for method in [None, LTTB, MIN_MAX]:
+            if method is None:
+                decimated, decimation = data, 0
+            else:
+                decimated = decimate(data, PLOT_WIDTH, method)
+                decimation = best_of(lambda: decimate(data, PLOT_WIDTH, method))
+            start = time.perf_counter()
+            html = line_html(decimated)
+            print(
+                "{:>8} {:<8} {:>8} {:>14.2f} {:>10.1f} {:>10.2f}".format(
+                    n,
+                    method or "none",
+                    len(decimated["x"]),
+                    decimation * 1e3,
+                    (time.perf_counter() - start) * 1e3,
+                    len(html) / 1e6,
+                )
+            )
+
+    start = time.perf_counter()
+    html = dashboard_html()
+    print(
+        "dashboard.html: {:.1f} kB, built in {:.0f} ms".format(
+            len(html) / 1e3, (time.perf_counter() - start) * 1e3
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
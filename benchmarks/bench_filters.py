@@ -0,0 +1,53 @@
+import argparse
+
+import numpy as np
+from scipy.ndimage import gaussian_filter, median_filter
+
+from common import best_of, image_path
+from image_processing import GAUSS, MEDIAN, filter_image, open_image, salt_pepper_noise
+
+WORKERS = [1, 2, 4, 8]
+# The slider ranges of the dashboard: median mask size 3-50, sigma 0-5
+CASES = [(MEDIAN, 3), (MEDIAN, 10), (MEDIAN, 25), (MEDIAN, 50)]
+CASES += [(GAUSS, 0.5), (GAUSS, 2.5), (GAUSS, 5)]
+
+
+# The original single threaded filter of the whole RGBA image, kept as the reference for the comparison
+def filter_whole(img, filter_type, value):
+    if filter_type == GAUSS:
+        return gaussian_filter(input=img, sigma=(value, value, 0))
+    return median_filter(input=img, size=(value, value, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of the tiled filters")
+    parser.add_argument("--image", default="image_1")
+    # large median masks take minutes on a full image with a single worker
+    parser.add_argument("--crop", type=int, default=256, help="rows and columns used")
+    args = parser.parse_args()
+
+    img, img_size = open_image(image_path(args.image))
+    img = salt_pepper_noise(img, img_size, 10, seed=0)[: args.crop, : args.crop]
+
+    print(
+        "{:<8} {:>6} {:>10}".format("filter", "value", "whole [s]")
+        + "".join("{:>12}".format("{} w [s]".format(w)) for w in WORKERS)
+    )
+    for filter_type, value in CASES:
+        reference = filter_whole(img, filter_type, value)
+        times = []
+        for workers in WORKERS:
+            result = filter_image(img, filter_type, value, workers=workers)
+            assert np.array_equal(result, reference), (filter_type, value, workers)
+            times.append(
+                best_of(lambda: filter_image(img, filter_type, value, workers), 1)
+            )
+        whole = best_of(lambda: filter_whole(img, filter_type, value), 1)
+        print(
+            "{:<8} {:>6} {:>10.3f}".format(filter_type, value, whole)
+            + "".join("{:>12.3f}".format(time) for time in times)
+        )
+
+
+if __name__ == "__main__":
+    main()
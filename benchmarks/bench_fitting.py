@@ -0,0 +1,86 @@
+import os
+import warnings
+
+import numpy as np
+
+from common import EXERCISE_1, best_of
+from births import DATASET, load_births
+from fitting import evaluate_polynomials, fit_polynomials
+
+# (number of series, degrees) of the sweeps, the first one is the fit of the exercise
+SWEEPS = [
+    (1, [2, 4, 6]),
+    (1, list(range(1, 16))),
+    (100, [2, 4, 6]),
+    (1000, list(range(1, 16))),
+]
+
+
+# Fits whose sum of squared residuals is larger than the other one by this factor count as worse
+RTOL = 1e-4
+
+
+# The original fitting loop: one polyfit and polyval per degree and series on the raw years. High degrees on the raw
+# years are badly conditioned, polyfit warns about that for every fit.
+def fit_loop(x, y, degrees, x_values):
+    curves = np.empty((len(x_values), len(degrees), y.shape[1]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for s in range(y.shape[1]):
+            for i, degree in enumerate(degrees):
+                curves[:, i, s] = np.polyval(np.polyfit(x, y[:, s], degree), x_values)
+    return curves
+
+
+def fit_batched(x, y, degrees, x_values):
+    coefficients, domain = fit_polynomials(x, y, degrees)
+    return evaluate_polynomials(coefficients, domain, x_values)
+
+
+# Sum of squared residuals at the data points of each degree and series
+def residuals(curves, y):
+    return ((curves - y[:, None, :]) ** 2).sum(axis=0)
+
+
+def main():
+    df = load_births(os.path.join(EXERCISE_1, DATASET))
+    x = df["Years"].to_numpy(dtype=float)
+    x_values = np.arange(x[0], x[-1] + 0.1, 0.1)
+    rng = np.random.default_rng(0)
+
+    print(
+        "{:>7} {:>8} {:>10} {:>12} {:>9} {:>22}".format(
+            "series",
+            "degrees",
+            "loop [s]",
+            "batched [s]",
+            "speedup",
+            "worse fits (loop/ours)",
+        )
+    )
+    for series, degrees in SWEEPS:
+        # the first series are the real births, the rest are noisy copies of them
+        y = df["Numbers"].to_numpy(dtype=float)[:, None] * rng.uniform(
+            0.5, 1.5, (len(x), series)
+        )
+        y[:, 0] = df["Numbers"]
+        loop = best_of(lambda: fit_loop(x, y, degrees, x_values), repeat=1)
+        batched = best_of(lambda: fit_batched(x, y, degrees, x_values))
+
+        loop_residuals = residuals(fit_loop(x, y, degrees, x), y)
+        batched_residuals = residuals(fit_batched(x, y, degrees, x), y)
+        print(
+            "{:>7} {:>8} {:>10.4f} {:>12.4f} {:>8.1f}x {:>11}/{:<10}".format(
+                series,
+                max(degrees),
+                loop,
+                batched,
+                loop / batched,
+                int((loop_residuals > batched_residuals * (1 + RTOL)).sum()),
+                int((batched_residuals > loop_residuals * (1 + RTOL)).sum()),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
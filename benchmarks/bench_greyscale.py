@@ -0,0 +1,75 @@
+import numpy as np
+
+from common import IMAGES, best_of, image_path, peak_memory
+from image_processing import GREYSCALE_FIXED_WEIGHTS, GREYSCALE_SCALE, GREYSCALE_WEIGHTS
+from image_processing import greyscale, open_image
+
+
+# The original float implementation, kept as the reference for the comparison
+def greyscale_float(img):
+    image = np.copy(img)
+
+    red = np.multiply(image[:, :, 0], GREYSCALE_WEIGHTS["red"])
+    green = np.multiply(image[:, :, 1], GREYSCALE_WEIGHTS["green"])
+    blue = np.multiply(image[:, :, 2], GREYSCALE_WEIGHTS["blue"])
+
+    image[:, :, 0] = red + green + blue
+    image[:, :, 1] = red + green + blue
+    image[:, :, 2] = red + green + blue
+    image[:, :, 3] = 255
+
+    return image
+
+
+# Compare both kernels on every possible RGB colour. The fixed point kernel computes the exact floor of the weighted
+# sum, the float kernel can land just below an integer (e.g. 0.3 * 10 + 0.59 * 0 + 0.11 * 0 < 3). The only
+# differences allowed are therefore +1 where the exact luminance is an integer.
+def check_exactness():
+    values = np.arange(256, dtype=np.uint8)
+    red, green, blue = np.meshgrid(values, values, values, indexing="ij")
+    alpha = np.full_like(red, 255)
+    img = np.stack([red, green, blue, alpha], axis=-1).reshape(4096, 4096, 4)
+
+    expected = greyscale_float(img).astype(np.int16)
+    result = greyscale(img).astype(np.int16)
+    difference = result - expected
+    weighted_sum = sum(
+        weight * channel.astype(np.int32)
+        for weight, channel in zip(GREYSCALE_FIXED_WEIGHTS, (red, green, blue))
+    ).reshape(4096, 4096)
+    mismatches = np.any(difference != 0, axis=-1)
+
+    assert np.all(difference[:, :, 3] == 0)
+    assert np.all(difference[mismatches][:, :3] == 1)
+    assert np.all(weighted_sum[mismatches] % GREYSCALE_SCALE == 0)
+    print(
+        "exactness: {} of {} colours differ by +1, all where the float kernel rounds an integer down".format(
+            mismatches.sum(), mismatches.size
+        )
+    )
+
+
+def main():
+    check_exactness()
+    print(
+        "{:<8} {:>11} {:>11} {:>11} {:>11} {:>11}".format(
+            "image", "float [ms]", "fixed [ms]", "out [ms]", "float [MB]", "fixed [MB]"
+        )
+    )
+    for name in IMAGES:
+        img, img_size = open_image(image_path(name))
+        out = np.empty(img.shape, dtype=np.uint8)
+        print(
+            "{:<8} {:>11.2f} {:>11.2f} {:>11.2f} {:>11.1f} {:>11.1f}".format(
+                name,
+                best_of(lambda: greyscale_float(img)) * 1e3,
+                best_of(lambda: greyscale(img)) * 1e3,
+                best_of(lambda: greyscale(img, out=out)) * 1e3,
+                peak_memory(lambda: greyscale_float(img)) / 1e6,
+                peak_memory(lambda: greyscale(img)) / 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
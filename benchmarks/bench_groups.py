@@ -0,0 +1,59 @@
+import argparse
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+from common import best_of
+from births import births_per_year, births_table
+from fitting import fit_groups
+from bench_ingest import write_dataset
+
+DEGREES = [2, 4, 6]
+TOP = [10, 100, 1000, 5000]
+
+
+# Fit every group separately with polyfit and polyval, like the script fits the global series. polyfit warns about
+# the badly conditioned fits on the raw years.
+def fit_groups_loop(table, degrees):
+    x = table.index.to_numpy(dtype=float)
+    errors = np.empty((len(x), len(degrees), table.shape[1]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for g, group in enumerate(table.columns):
+            y = table[group].to_numpy(dtype=float)
+            for i, degree in enumerate(degrees):
+                errors[:, i, g] = np.abs(np.polyval(np.polyfit(x, y, degree), x) - y)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10**6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "births.csv")
+        write_dataset(path, args.rows)
+        for by in ["gender", "name"]:
+            ingest = best_of(lambda: births_per_year(path, by=by), repeat=1)
+            print("ingest by {}: {:.2f} s".format(by, ingest))
+        counts = births_per_year(path, by="name")
+
+    print(
+        "{:>6} {:>10} {:>12} {:>9}".format("top", "loop [s]", "batched [s]", "speedup")
+    )
+    for top in TOP:
+        table = births_table(counts, top=top)
+        loop = best_of(lambda: fit_groups_loop(table, DEGREES), repeat=1)
+        batched = best_of(lambda: fit_groups(table, DEGREES))
+        print(
+            "{:>6} {:>10.4f} {:>12.4f} {:>8.1f}x".format(
+                table.shape[1], loop, batched, loop / batched
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
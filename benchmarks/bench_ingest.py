@@ -0,0 +1,92 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import EXERCISE_1, best_of, peak_memory
+from births import CHUNK_ROWS, COLUMNS, DATASET, MAXIMUM_YEAR, births_per_year
+
+ROWS = [10**5, 10**6, 10**7, 10**8]
+
+
+# Write a synthetic registry export with the given number of rows. Names and genders are drawn from the real dataset,
+# years of birth uniformly around the range of the real data.
+def write_dataset(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = pd.read_csv(os.path.join(EXERCISE_1, DATASET))
+    names = sample["HUNDENAME"].to_numpy()
+    genders = sample["GESCHLECHT_HUND"].to_numpy()
+
+    header = True
+    for start in range(0, rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - start)
+        chunk = pd.DataFrame(
+            {
+                "HUNDENAME": rng.choice(names, size),
+                "GEBURTSJAHR_HUND": rng.integers(1990, 2018, size),
+                "GESCHLECHT_HUND": rng.choice(genders, size),
+            }
+        )
+        chunk.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+
+# The original ingest: read the whole file, then filter and count
+def births_per_year_plain(path):
+    df1 = pd.read_csv(path).rename(columns=COLUMNS)
+    df1 = df1.loc[df1["birth_year"] < MAXIMUM_YEAR]
+    return df1.groupby("birth_year").size()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-rows", type=int, default=ROWS[-1])
+    parser.add_argument(
+        "--skip-plain", action="store_true", help="only run the streaming ingest"
+    )
+    args = parser.parse_args()
+
+    print(
+        "{:>10} {:>10} {:>12} {:>12} {:>16} {:>16}".format(
+            "rows",
+            "file [MB]",
+            "plain [s]",
+            "chunked [s]",
+            "plain peak [MB]",
+            "chunked peak [MB]",
+        )
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in ROWS:
+            if rows > args.max_rows:
+                break
+            path = os.path.join(directory, "births_{}.csv".format(rows))
+            write_dataset(path, rows)
+
+            chunked = best_of(lambda: births_per_year(path), repeat=1)
+            chunked_peak = peak_memory(lambda: births_per_year(path))
+            if args.skip_plain:
+                plain = plain_peak = float("nan")
+            else:
+                expected = births_per_year_plain(path)
+                assert (expected.to_numpy() == births_per_year(path).to_numpy()).all()
+                plain = best_of(lambda: births_per_year_plain(path), repeat=1)
+                plain_peak = peak_memory(lambda: births_per_year_plain(path))
+
+            print(
+                "{:>10} {:>10.1f} {:>12.2f} {:>12.2f} {:>16.1f} {:>16.1f}".format(
+                    rows,
+                    os.path.getsize(path) / 1e6,
+                    plain,
+                    chunked,
+                    plain_peak / 1e6,
+                    chunked_peak / 1e6,
+                )
+            )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+from common import best_of
+from fitting import curve_x
+from interpolation import barycentric_interpolate, spline_interpolate
+
+NODES = [6, 10, 20, 50, 100, 1000]
+START_YEAR = 1998
+END_YEAR = 2015
+# Width of plot 1 in the exercise, the curves are evaluated at the x values curve_x gives for it
+PLOT_WIDTH = 1500
+
+
+# A smooth births curve to interpolate
+def births(x):
+    t = (x - START_YEAR) / (END_YEAR - START_YEAR)
+    return 400 + 200 * np.sin(3 * t) + 50 * np.cos(11 * t)
+
+
+# Chebyshev points on the years, polynomial interpolation on them converges as the number of nodes grows
+def chebyshev_years(n):
+    t = np.cos(np.pi * (2 * np.arange(n) + 1) / (2 * n))[::-1]
+    return START_YEAR + (t + 1) / 2 * (END_YEAR - START_YEAR)
+
+
+# The original approach: solve the Vandermonde system of the raw years and evaluate with polyval
+def vandermonde_interpolate(x, y, x_values):
+    coefficients = np.linalg.solve(np.vander(x, len(x)), y)
+    return np.polyval(coefficients, x_values)
+
+
+def main():
+    x_values = curve_x(START_YEAR, END_YEAR, PLOT_WIDTH)
+    expected = births(x_values)
+    methods = [
+        ("vandermonde", vandermonde_interpolate),
+        ("barycentric", barycentric_interpolate),
+        ("spline", spline_interpolate),
+    ]
+
+    print(
+        "{:>6} {:<12} {:>10} {:>14} {:>14}".format(
+            "nodes", "method", "time [ms]", "max error", "node error"
+        )
+    )
+    for n in NODES:
+        x = chebyshev_years(n)
+        y = births(x)
+        for name, interpolate in methods:
+            if name == "vandermonde" and n > 100:
+                continue
+            with np.errstate(all="ignore"):
+                values = interpolate(x, y, x_values)
+                node_values = interpolate(x, y, x)
+            print(
+                "{:>6} {:<12} {:>10.3f} {:>14.3e} {:>14.3e}".format(
+                    n,
+                    name,
+                    best_of(lambda: interpolate(x, y, x_values)) * 1e3,
+                    np.abs(values - expected).max(),
+                    np.abs(node_values - y).max(),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import time
+
+from bokeh.client import pull_session
+from bokeh.models import CheckboxGroup, Div, Slider
+
+from common import EXERCISE_1, decode_binary_patches, server_url, start_server
+
+PORT = 5067
+SCRIPT = os.path.join(EXERCISE_1, "dva_hs19_ex1.py")
+URL = server_url(SCRIPT, PORT)
+REPEAT = 5
+
+
+def model(session, model_type, title=None):
+    return [
+        model
+        for model in session.document.select({"type": model_type})
+        if title is None or model.title == title
+    ][0]
+
+
+# Change a control like the browser does and wait until the server has sent the updated dashboard back. The latency
+# div reports the time the server spent on the change.
+def change(session, control, attr, value):
+    div = model(session, Div)
+    text = div.text
+    start = time.perf_counter()
+    setattr(control, attr, value)
+    session._connection._loop_until(lambda: div.text != text)
+    return time.perf_counter() - start, div.text
+
+
+def main():
+    decode_binary_patches()
+    server = start_server(SCRIPT, PORT)
+    try:
+        session = pull_session(url=URL)
+        max_year = model(session, Slider, "Maximum year")
+        min_value = model(session, Slider, "Minimum births per year")
+        degrees = model(session, CheckboxGroup)
+        changes = [
+            ("maximum year", max_year, "value_throttled", [2010, 2016]),
+            ("minimum births", min_value, "value_throttled", [50, 10]),
+            ("add degree", degrees, "active", [[0, 1, 3, 5], [1, 3, 5]]),
+            ("remove degree", degrees, "active", [[1, 3], [1, 3, 5]]),
+        ]
+
+        print(
+            "{:<16} {:>14} {:>14}".format("control", "round trip [ms]", "server [ms]")
+        )
+        for name, control, attr, values in changes:
+            round_trips = []
+            server_times = []
+            for _ in range(REPEAT):
+                for value in values:
+                    round_trip, text = change(session, control, attr, value)
+                    round_trips.append(round_trip)
+                    server_times.append(float(text.split()[-2]))
+            print(
+                "{:<16} {:>14.1f} {:>14.1f}".format(
+                    name,
+                    sorted(round_trips)[len(round_trips) // 2] * 1e3,
+                    sorted(server_times)[len(server_times) // 2],
+                )
+            )
+        session.close()
+    finally:
+        server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+
+import numpy as np
+from scipy.ndimage import median_filter
+
+from common import best_of, image_path
+from image_processing import fast_median_filter, open_image, salt_pepper_noise
+
+SIZES = [3, 5, 10, 15, 20, 30, 40, 50]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Median filters over the mask sizes")
+    parser.add_argument("--image", default="image_1")
+    # the scipy median takes minutes for large masks on a full image
+    parser.add_argument("--crop", type=int, default=256, help="rows and columns used")
+    args = parser.parse_args()
+
+    img, img_size = open_image(image_path(args.image))
+    img = salt_pepper_noise(img, img_size, 10, seed=0)[: args.crop, : args.crop, :3]
+
+    print("{:>5} {:>12} {:>12}".format("size", "scipy [s]", "fast [s]"))
+    for size in SIZES:
+        reference = median_filter(img, size=(size, size, 1))
+        assert np.array_equal(fast_median_filter(img, size), reference), size
+        print(
+            "{:>5} {:>12.3f} {:>12.3f}".format(
+                size,
+                best_of(lambda: median_filter(img, size=(size, size, 1)), 1),
+                best_of(lambda: fast_median_filter(img, size), 1),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from common import best_of
+from births import COLUMNS
+from names import NameIndex
+from bench_ingest import write_dataset
+
+PREFIXES = ["", "b", "lu", "max"]
+YEAR = 2010
+
+
+# Answer the queries with groupby calls on the raw data frame
+def top_names_groupby(df, n, prefix="", years=None):
+    if prefix:
+        df = df[df["name"].str.casefold().str.startswith(prefix)]
+    if years is not None:
+        df = df[(df["birth_year"] >= years[0]) & (df["birth_year"] < years[1])]
+    counts = df.groupby(["name", "gender"]).size().unstack(fill_value=0)
+    counts["births"] = counts.sum(axis=1)
+    return counts.sort_values("births", ascending=False).head(n)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10**6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "births.csv")
+        write_dataset(path, args.rows)
+        build = best_of(lambda: NameIndex.from_dataset(path), repeat=1)
+        index = NameIndex.from_dataset(path)
+        df = pd.read_csv(path).rename(columns=COLUMNS)
+    print("index of {} names built in {:.2f} s".format(len(index.names), build))
+
+    print(
+        "{:<24} {:>14} {:>12} {:>9}".format(
+            "query", "groupby [ms]", "index [ms]", "speedup"
+        )
+    )
+    queries = [
+        ("top 10", {}),
+        ("top 10 in {}".format(YEAR), {"years": (YEAR, YEAR + 1)}),
+    ]
+    queries += [
+        ("top 10 '{}'".format(prefix), {"prefix": prefix}) for prefix in PREFIXES[1:]
+    ]
+    for name, query in queries:
+        expected = top_names_groupby(df, 10, **query)
+        result = index.top_names(10, **query)
+        assert list(result["births"]) == list(expected["births"])
+        groupby = best_of(lambda: top_names_groupby(df, 10, **query))
+        indexed = best_of(lambda: index.top_names(10, **query))
+        print(
+            "{:<24} {:>14.2f} {:>12.3f} {:>8.0f}x".format(
+                name, groupby * 1e3, indexed * 1e3, groupby / indexed
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import random
+
+import numpy as np
+
+from common import IMAGES, best_of, image_path
+from image_processing import open_image, salt_pepper_noise
+
+PERCENTAGES = [1, 10, 50]
+
+
+# The original per-pixel implementation, kept as the reference for the comparison
+def salt_pepper_noise_loop(img, img_size, percentage):
+    image = np.copy(img)
+    black = [0, 0, 0, 255]
+    white = [255, 255, 255, 255]
+
+    for i in range(int(img_size[0] * img_size[1] / 100 * percentage)):
+        black_or_white = random.randint(0, 1)
+        x_pixel = random.randint(0, img_size[0] - 1)
+        y_pixel = random.randint(0, img_size[1] - 1)
+
+        if black_or_white:
+            image[y_pixel, x_pixel, :] = black
+        else:
+            image[y_pixel, x_pixel, :] = white
+
+    return image
+
+
+def main():
+    print(
+        "{:<8} {:>6} {:>10} {:>12} {:>9}".format(
+            "image", "noise", "loop [s]", "numpy [s]", "speedup"
+        )
+    )
+    for name in IMAGES:
+        img, img_size = open_image(image_path(name))
+        for percentage in PERCENTAGES:
+            loop = best_of(
+                lambda: salt_pepper_noise_loop(img, img_size, percentage), repeat=1
+            )
+            vectorized = best_of(
+                lambda: salt_pepper_noise(img, img_size, percentage, seed=0)
+            )
+            print(
+                "{:<8} {:>5}% {:>10.4f} {:>12.4f} {:>8.1f}x".format(
+                    name, percentage, loop, vectorized, loop / vectorized
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from common import IMAGES, best_of, image_path
+from image_processing import build_pyramid, image_entry, open_image
+
+# Level sent to each figure of the dashboard: fig1 at half, fig2..fig7 at a quarter of the image size
+FIGURE_LEVELS = [
+    ("image", 1),
+    ("image", 2),
+    ("image", 2),
+    ("red", 2),
+    ("green", 2),
+    ("blue", 2),
+    ("greyscale", 2),
+]
+
+
+def main():
+    print(
+        "{:<8} {:>12} {:>14} {:>14}".format(
+            "image", "build [ms]", "full [MB]", "pyramid [MB]"
+        )
+    )
+    for name in IMAGES:
+        img, img_size = open_image(image_path(name))
+        entry = image_entry(image_path(name))
+        full = sum(entry[key][0].nbytes for key, level in FIGURE_LEVELS)
+        pyramid = sum(entry[key][level].nbytes for key, level in FIGURE_LEVELS)
+        print(
+            "{:<8} {:>12.2f} {:>14.1f} {:>14.1f}".format(
+                name,
+                best_of(lambda: build_pyramid(img)) * 1e3,
+                full / 1e6,
+                pyramid / 1e6,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+
+from bokeh.client import pull_session
+from bokeh.models import Button, Slider
+from bokeh.protocol.messages.event import event_1
+
+from common import EXERCISE_2, server_url, start_server
+
+PORT = 5066
+SCRIPT = os.path.join(EXERCISE_2, "dva_ex2_HS19.py")
+URL = server_url(SCRIPT, PORT)
+SESSIONS = 4
+MEDIAN_SIZE = 9
+NOISE_STEPS = 5
+
+
+def slider(session, title):
+    return [
+        model
+        for model in session.document.select({"type": Slider})
+        if model.title.startswith(title)
+    ][0]
+
+
+def main_figure(session):
+    return session.document.roots[0].children[0].children[0]
+
+
+# Send the click of the filter button like the browser does
+def click_filter(session):
+    button = [
+        model
+        for model in session.document.select({"type": Button})
+        if model.label == "Filter"
+    ][0]
+    content = json.dumps(
+        {"event_name": "button_click", "event_values": {"model_id": button.id}}
+    )
+    message = event_1(event_1.create_header(), {}, content)
+    session._connection._send_message_wait_for_reply(message)
+
+
+# Wait until the title of the main figure of a session shows one of the given states. The client only applies
+# updates pushed by the server while its connection loop runs.
+def wait_for_title(session, titles):
+    start = time.perf_counter()
+    session._connection._loop_until(lambda: main_figure(session).title.text in titles)
+    return time.perf_counter() - start
+
+
+def main():
+    server = start_server(SCRIPT, PORT)
+    try:
+        sessions = [pull_session(url=URL) for _ in range(SESSIONS)]
+
+        # the first session starts a large median filter
+        busy = sessions[0]
+        slider(busy, "Mask Size").value = MEDIAN_SIZE
+        busy.force_roundtrip()
+        start = time.perf_counter()
+        click_filter(busy)
+
+        # meanwhile the other sessions add noise and wait for the result
+        latencies = []
+        for step in range(1, NOISE_STEPS + 1):
+            for session in sessions[1:]:
+                start_noise = time.perf_counter()
+                slider(session, "Noise").value_throttled = step
+                wait_for_title(session, ["Noisy"])
+                latencies.append(time.perf_counter() - start_noise)
+
+        wait_for_title(busy, ["Filtered"])
+        print(
+            "median {0}x{0} in session 1: {1:.2f} s".format(
+                MEDIAN_SIZE, time.perf_counter() - start
+            )
+        )
+        print(
+            "noise in sessions 2-{}: mean {:.3f} s, max {:.3f} s".format(
+                SESSIONS, sum(latencies) / len(latencies), max(latencies)
+            )
+        )
+        for session in sessions:
+            session.close()
+    finally:
+        server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import time
+
+from bokeh.client import pull_session
+from bokeh.models import Plot
+
+from common import EXERCISE_2, decode_binary_patches, server_url, start_server
+
+PORT = 5068
+SCRIPT = os.path.join(EXERCISE_2, "dva_ex2_HS19.py")
+URL = server_url(SCRIPT, PORT)
+SESSIONS = 5
+# Width of fig1 reported by the client, like a browser does after laying out the figure
+PAINTED_WIDTH = 500
+
+
+def figures(session):
+    return list(session.document.select({"type": Plot}))
+
+
+# Open a session like a browser: pull the document, report the layout of fig1 and wait for the remaining figures.
+# Returns the seconds until the first document arrived, its size and the seconds until all figures were there.
+def open_session():
+    start = time.perf_counter()
+    session = pull_session(url=URL)
+    pulled = time.perf_counter() - start
+    size = len(session.document.to_json_string())
+    shown = len(figures(session))
+
+    fig1 = figures(session)[0]
+    fig1.set_from_json("inner_width", PAINTED_WIDTH)
+    session._connection._loop_until(lambda: len(figures(session)) == 7)
+    complete = time.perf_counter() - start
+    session.close()
+    return pulled, size, shown, complete
+
+
+def main():
+    decode_binary_patches()
+    server = start_server(SCRIPT, PORT, stdout=subprocess.PIPE)
+    try:
+        print(
+            "{:>8} {:>16} {:>14} {:>8} {:>18}".format(
+                "session",
+                "document [ms]",
+                "document [kB]",
+                "figures",
+                "all figures [ms]",
+            )
+        )
+        for index in range(SESSIONS):
+            pulled, size, shown, complete = open_session()
+            print(
+                "{:>8} {:>16.1f} {:>14.1f} {:>8} {:>18.1f}".format(
+                    index + 1, pulled * 1e3, size / 1e3, shown, complete * 1e3
+                )
+            )
+    finally:
+        server.kill()
+    output = server.communicate()[0]
+    for line in output.splitlines():
+        if "first paint" in line:
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+
+from bokeh.events import LODEnd, Reset
+from bokeh.protocol import Protocol
+
+from common import EXERCISE_2
+
+
+# Pan or zoom fig1 like the browser does: the ranges are synced while the user interacts, LODEnd follows at the end
+def zoom(ns, x_start, x_end):
+    fig1 = ns["fig1"]
+    fig1.x_range.start = x_start
+    fig1.x_range.end = x_end
+    fig1._trigger_event(LODEnd(fig1))
+
+
+# Click the reset button: the server resets the dashboard, the browser resets the ranges of fig1 and sends Reset
+def reset(ns):
+    fig1 = ns["fig1"]
+    ns["reset_dashboard"]()
+    fig1.x_range.start, fig1.x_range.end = 0, ns["img_size"][0]
+    fig1.y_range.start, fig1.y_range.end = 0, ns["img_size"][1]
+    fig1._trigger_event(Reset(fig1))
+
+
+ACTIONS = [
+    ("noise 5 %", lambda ns: setattr(ns["noise_slider"], "value_throttled", 5)),
+    (
+        "median 3x3",
+        lambda ns: (setattr(ns["filter_slider"], "value", 3), ns["filter_noise"]()),
+    ),
+    ("median 3x3 again", lambda ns: ns["filter_noise"]()),
+    ("select image_2", lambda ns: setattr(ns["image_selector"], "value", "image_2")),
+    ("zoom", lambda ns: zoom(ns, 100, 400)),
+    ("zoom again", lambda ns: zoom(ns, 100, 400)),
+    ("reset", reset),
+    ("reset again", reset),
+]
+
+
+# Run the dashboard in this process, jobs are run synchronously so every action finishes before it is measured
+def load_dashboard():
+    namespace = {"__file__": os.path.join(EXERCISE_2, "dva_ex2_HS19.py")}
+    os.chdir(EXERCISE_2)
+    with open("dva_ex2_HS19.py") as f:
+        exec(f.read(), namespace)
+
+    def submit_job(kind, apply, compute):
+        apply(compute(lambda: False))
+        namespace["send_updates"](kind)
+
+    namespace["submit_job"] = submit_job
+    return namespace
+
+
+# Size of the websocket frames the server sends for a document event. Column changes are serialized from the current
+# data of the source, so this has to run when the event happens.
+def patch_bytes(event):
+    message = Protocol("1.0").create("PATCH-DOC", [event], use_buffers=True)
+    total = len(message.header_json) + len(message.metadata_json)
+    total += len(message.content_json)
+    total += sum(len(header) + len(payload) for header, payload in message.buffers)
+    return total
+
+
+def main():
+    namespace = load_dashboard()
+    patches = []
+    namespace["doc"].on_change(lambda event: patches.append(patch_bytes(event)))
+
+    print(
+        "{:<18} {:>10} {:>14} {:>16}".format(
+            "action", "patches", "image [kB]", "websocket [kB]"
+        )
+    )
+    for name, action in ACTIONS:
+        before = sum(total for _, total in namespace["transport_stats"].values())
+        del patches[:]
+        action(namespace)
+        after = sum(total for _, total in namespace["transport_stats"].values())
+        print(
+            "{:<18} {:>10} {:>14.1f} {:>16.1f}".format(
+                name, len(patches), (after - before) / 1e3, sum(patches) / 1e3
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Make the exercise modules and the shared instrumentation importable from the benchmark scripts
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXERCISE_1 = os.path.join(ROOT, "Exercise 1")
+EXERCISE_2 = os.path.join(ROOT, "Exercise 2")
+for path in (ROOT, EXERCISE_1, EXERCISE_2):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+IMAGES = ["image_1", "image_2", "image_3", "image_4", "image_5"]
+
+
+# Path (without extension) of one of the bundled images, as expected by open_image
+def image_path(name):
+    return os.path.join(EXERCISE_2, name)
+
+
+# Best wall time in seconds over a few runs of func
+def best_of(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Peak memory in bytes allocated through Python/numpy while running func
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# URL of a dashboard served by start_server
+def server_url(script, port):
+    return "http://localhost:{}/{}".format(
+        port, os.path.splitext(os.path.basename(script))[0]
+    )
+
+
+# Start a local bokeh server with a dashboard script in its directory and wait until it accepts sessions. The output
+# of the server, its log included, goes to stdout.
+def start_server(script, port, stdout=subprocess.DEVNULL):
+    from bokeh.client import pull_session
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "bokeh",
+            "serve",
+            os.path.basename(script),
+            "--port",
+            str(port),
+        ],
+        cwd=os.path.dirname(script),
+        stdout=stdout,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    for _ in range(60):
+        try:
+            pull_session(url=server_url(script, port)).close()
+            return server
+        except IOError:
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("bokeh server did not start")
+
+
+# The python client of bokeh 1.4 cannot read arrays sent as binary buffers, they are turned into lists before the
+# patches are applied to the document of the client
+def decode_buffers(value, buffers):
+    if isinstance(value, dict):
+        if "__buffer__" in value:
+            array = np.frombuffer(buffers[value["__buffer__"]], dtype=value["dtype"])
+            return array.reshape(value["shape"]).tolist()
+        return {key: decode_buffers(item, buffers) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_buffers(item, buffers) for item in value]
+    return value
+
+
+def handle_patch(session, message):
+    buffers = {json.loads(header)["id"]: payload for header, payload in message.buffers}
+    message.content = decode_buffers(message.content, buffers)
+    message.apply_to_document(session.document, session)
+
+
+# Let the python client apply patches with binary buffers, called by the benchmarks that receive them
+def decode_binary_patches():
+    from bokeh.client.session import ClientSession
+
+    ClientSession._handle_patch = handle_patch
@@ -0,0 +1,210 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from common import EXERCISE_1, IMAGES, best_of, image_path, peak_memory
+from births import DATASET, births_per_year, clean_births
+from fitting import evaluate_polynomials, fit_polynomials
+from image_processing import (
+    FAST_MEDIAN,
+    GAUSS,
+    MEDIAN,
+    filter_image,
+    greyscale,
+    open_image,
+    salt_pepper_noise,
+)
+from bench_ingest import write_dataset
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Synthetic image sizes, filters and synthetic CSV rows per scale, the full scale takes a long time and a lot of disk
+# space
+IMAGE_SIZES = {
+    "quick": {"1080p": (1920, 1080), "4k": (3840, 2160)},
+    "full": {"1080p": (1920, 1080), "4k": (3840, 2160), "8k": (7680, 4320)},
+}
+CSV_ROWS = {"quick": [10**6], "full": [10**6, 10**7, 10**8]}
+NOISE_PERCENTAGE = 10
+FILTERS = {
+    "quick": [(MEDIAN, 3), (GAUSS, 2)],
+    "full": [(MEDIAN, 3), (MEDIAN, 9), (FAST_MEDIAN, 25), (GAUSS, 2)],
+}
+DEGREES = list(range(1, 7))
+# A case fails when its time grows by more than this factor over the baseline, peak memory by MEMORY_THRESHOLD
+THRESHOLD = 1.5
+MEMORY_THRESHOLD = 1.1
+MEASURE_SECONDS = 1
+MIN_REPEAT = 3
+MAX_REPEAT = 1000
+
+
+# image_1 scaled to a synthetic size, converted and flipped like open_image does
+def scaled_image(size):
+    image = Image.open(image_path(IMAGES[0]) + ".jpg").resize(size, Image.BICUBIC)
+    return np.flipud(np.array(image.convert("RGBA")))
+
+
+# Whether any of the names matches the glob pattern of the cases to run
+def selected(names, pattern):
+    return any(fnmatch.fnmatch(name, pattern) for name in names)
+
+
+def image_case_names(name, scale):
+    names = ["greyscale/" + name, "noise/" + name]
+    names += ["filter {} {}/{}".format(f, v, name) for f, v in FILTERS[scale]]
+    return names
+
+
+# The image kernels of the dashboard on one image
+def image_cases(name, scale, img):
+    size = [img.shape[1], img.shape[0]]
+    noisy = salt_pepper_noise(img, size, NOISE_PERCENTAGE, seed=0)
+    funcs = [
+        lambda: greyscale(img),
+        lambda: salt_pepper_noise(img, size, NOISE_PERCENTAGE, seed=0),
+    ]
+    funcs += [lambda f=f, v=v: filter_image(noisy, f, v) for f, v in FILTERS[scale]]
+    return list(zip(image_case_names(name, scale), funcs))
+
+
+# Cases of the bundled images and of image_1 scaled to the synthetic sizes. The images of a size are only created when
+# one of its cases runs, and only one size is in memory at a time.
+def all_image_cases(scale, pattern):
+    yield "open/bundled", lambda: [open_image(image_path(name)) for name in IMAGES]
+    for name in IMAGES:
+        if selected(image_case_names(name, scale), pattern):
+            yield from image_cases(name, scale, open_image(image_path(name))[0])
+    for name, size in IMAGE_SIZES[scale].items():
+        if selected(image_case_names(name, scale), pattern):
+            yield from image_cases(name, scale, scaled_image(size))
+
+
+def births_case_names(name):
+    return ["ingest/" + name, "fit/" + name]
+
+
+# Ingest and fitting of a births dataset
+def births_cases(name, path):
+    counts = births_per_year(path)
+    df = clean_births(counts)
+    years = df["Years"].to_numpy()
+    numbers = df["Numbers"].to_numpy()
+    x_values = np.linspace(years[0], years[-1], 1500)
+
+    def fit():
+        coefficients, domain = fit_polynomials(years, numbers, DEGREES)
+        return evaluate_polynomials(coefficients, domain, x_values)
+
+    return list(zip(births_case_names(name), [lambda: births_per_year(path), fit]))
+
+
+# Cases of the real dataset and of synthetic datasets, which are only written when one of their cases runs
+def all_births_cases(scale, pattern, directory):
+    if selected(births_case_names("hundenamen"), pattern):
+        yield from births_cases("hundenamen", os.path.join(EXERCISE_1, DATASET))
+    for rows in CSV_ROWS[scale]:
+        name = "{:.0e} rows".format(rows)
+        if not selected(births_case_names(name), pattern):
+            continue
+        path = os.path.join(directory, "births_{}.csv".format(rows))
+        write_dataset(path, rows)
+        yield from births_cases(name, path)
+        os.remove(path)
+
+
+# Seconds and peak bytes of one case. The time is the best of as many runs as fit into MEASURE_SECONDS, at least
+# MIN_REPEAT and at most MAX_REPEAT, so short cases are not dominated by noise and long cases run once.
+def measure(func):
+    seconds = best_of(func, repeat=1)
+    repeat = min(max(int(MEASURE_SECONDS / seconds), MIN_REPEAT), MAX_REPEAT)
+    if seconds < MEASURE_SECONDS:
+        seconds = min(seconds, best_of(func, repeat))
+    return {"seconds": seconds, "peak_bytes": peak_memory(func)}
+
+
+# Ratios of a result to its baseline, None for new cases
+def compare(result, baseline):
+    if baseline is None:
+        return None, None
+    return (
+        result["seconds"] / baseline["seconds"],
+        result["peak_bytes"] / max(baseline["peak_bytes"], 1),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the benchmark cases and compare them to the stored baseline."
+    )
+    parser.add_argument("--scale", choices=sorted(IMAGE_SIZES), default="quick")
+    parser.add_argument("--cases", default="*", help="glob pattern of the case names")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument(
+        "--update", action="store_true", help="store the results as the new baseline"
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(
+        "{:<36} {:>10} {:>10} {:>12} {:>8}  {}".format(
+            "case", "time [ms]", "vs base", "peak [MB]", "vs base", ""
+        )
+    )
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [
+            all_image_cases(args.scale, args.cases),
+            all_births_cases(args.scale, args.cases, directory),
+        ]
+        for name, func in (case for group in cases for case in group):
+            if not fnmatch.fnmatch(name, args.cases):
+                continue
+            result = measure(func)
+            time_ratio, memory_ratio = compare(result, baseline.get(name))
+            # a slow run is measured again before it counts, other processes can slow down a single measurement
+            if time_ratio is not None and time_ratio > args.threshold:
+                result["seconds"] = min(result["seconds"], measure(func)["seconds"])
+                time_ratio, memory_ratio = compare(result, baseline.get(name))
+            results[name] = result
+            status = ""
+            if time_ratio is None:
+                status = "new"
+            elif time_ratio > args.threshold or memory_ratio > args.memory_threshold:
+                status = "REGRESSION"
+                failures.append(name)
+            print(
+                "{:<36} {:>10.1f} {:>10} {:>12.1f} {:>8}  {}".format(
+                    name,
+                    result["seconds"] * 1e3,
+                    "" if time_ratio is None else "{:.2f}x".format(time_ratio),
+                    result["peak_bytes"] / 1e6,
+                    "" if memory_ratio is None else "{:.2f}x".format(memory_ratio),
+                    status,
+                )
+            )
+
+    if args.update:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("baseline of {} cases written to {}".format(len(results), args.baseline))
+    elif failures:
+        print("{} cases regressed: {}".format(len(failures), ", ".join(failures)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
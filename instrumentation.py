@@ -0,0 +1,182 @@
+import json
+import numpy as np
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+from bokeh.document.events import ColumnDataChangedEvent, ModelChangedEvent
+from bokeh.models import ColumnDataSource, DataTable, NumberFormatter, TableColumn
+
+# Constants
+# Set to a file name to record the stages of the dashboard and export them as JSON lines, 1 uses LOG_FILE
+ENVIRONMENT_VARIABLE = "DVA_INSTRUMENT"
+LOG_FILE = "instrumentation.jsonl"
+TABLE_ROWS = 20
+REFRESH_MS = 500
+
+# Stages open in any thread, tracemalloc only has one peak for the whole process
+open_stages = []
+stages_lock = threading.Lock()
+log_lock = threading.Lock()
+
+
+# File the records are exported to, None while instrumentation is off
+def log_path():
+    value = os.environ.get(ENVIRONMENT_VARIABLE, "")
+    if value in ("", "0"):
+        return None
+    return LOG_FILE if value == "1" else value
+
+
+# Bytes of the columns of a data source sent to the browser
+def data_nbytes(data, columns):
+    return sum(np.asarray(data[column]).nbytes for column in columns)
+
+
+# Peak traced memory since the last reset, folded into every open stage before the peak is reset again
+def fold_peak():
+    peak = tracemalloc.get_traced_memory()[1]
+    for stage in open_stages:
+        stage["peak"] = max(stage["peak"], peak)
+
+
+# Records wall time, allocated bytes and payload bytes of named stages and callbacks of one session. The allocated
+# bytes are the peak of memory traced by tracemalloc during the stage above the memory in use when it started, so
+# stages running at the same time in other threads are included. The payload bytes are the data source columns the
+# stage changed in a watched document. When instrumentation is off, stage() and wrap() cost next to nothing.
+class Recorder:
+    def __init__(self, session, path=None, rows=TABLE_ROWS):
+        self.session = session
+        self.path = log_path() if path is None else path
+        self.enabled = self.path is not None
+        self.records = deque(maxlen=rows)
+        self.stack = threading.local()
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        stage = {"peak": 0, "payload": 0}
+        stack = self.thread_stack()
+        with stages_lock:
+            fold_peak()
+            tracemalloc.reset_peak()
+            stage["start"] = tracemalloc.get_traced_memory()[0]
+            open_stages.append(stage)
+        stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            with stages_lock:
+                fold_peak()
+                open_stages.remove(stage)
+            self.add(name, seconds, stage["peak"] - stage["start"], stage["payload"])
+
+    # Wrap a function or callback so every call is recorded as a stage. The wrapper keeps the signature, bokeh checks
+    # it when callbacks are registered.
+    def wrap(self, name, func):
+        if not self.enabled:
+            return func
+
+        @wraps(func)
+        def recorded(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+
+        return recorded
+
+    # Count the columns of data sources changed in a document as payload of the stages open at that moment. Document
+    # callbacks run in the thread that made the change.
+    def watch(self, doc):
+        if self.enabled:
+            doc.on_change(self.count_payload)
+
+    def count_payload(self, event):
+        if not isinstance(event, ModelChangedEvent) or event.attr != "data":
+            return
+        columns = event.model.data.keys()
+        if isinstance(event.hint, ColumnDataChangedEvent) and event.hint.cols:
+            columns = event.hint.cols
+        nbytes = data_nbytes(event.model.data, columns)
+        for stage in self.thread_stack():
+            stage["payload"] += nbytes
+
+    def thread_stack(self):
+        if not hasattr(self.stack, "stages"):
+            self.stack.stages = []
+        return self.stack.stages
+
+    def add(self, name, seconds, allocated, payload):
+        record = {
+            "time": time.time(),
+            "session": self.session,
+            "stage": name,
+            "ms": seconds * 1e3,
+            "allocated": allocated,
+            "payload": payload,
+        }
+        self.records.append(record)
+        line = json.dumps(record) + "\n"
+        with log_lock, open(self.path, "a") as log:
+            log.write(line)
+
+    # Table of the latest records, newest first. In a bokeh server session it is refreshed periodically, as records
+    # are also added by worker threads.
+    def table(self, doc, width=600):
+        source = ColumnDataSource(self.table_data())
+        columns = [
+            TableColumn(field="stage", title="Stage"),
+            TableColumn(
+                field="ms", title="Time [ms]", formatter=NumberFormatter(format="0.0")
+            ),
+            TableColumn(
+                field="allocated",
+                title="Allocated [kB]",
+                formatter=NumberFormatter(format="0,0"),
+            ),
+            TableColumn(
+                field="payload",
+                title="Payload [kB]",
+                formatter=NumberFormatter(format="0,0"),
+            ),
+        ]
+        # newest record in the table
+        shown = [None]
+
+        def refresh():
+            if self.records and self.records[-1] is not shown[0]:
+                shown[0] = self.records[-1]
+                source.data = self.table_data()
+
+        if doc.session_context is not None:
+            doc.add_periodic_callback(refresh, REFRESH_MS)
+        return DataTable(
+            source=source, columns=columns, width=width, index_position=None
+        )
+
+    def table_data(self):
+        records = list(reversed(self.records))
+        return {
+            "stage": [record["stage"] for record in records],
+            "ms": [record["ms"] for record in records],
+            "allocated": [record["allocated"] / 1e3 for record in records],
+            "payload": [record["payload"] / 1e3 for record in records],
+        }
+
+
+# Name of the session of a document in the records
+def session_name(doc):
+    if doc.session_context is None:
+        return "standalone"
+    return doc.session_context.id